@@ -10,6 +10,9 @@ import logging
 import os
 import time
 import json
+import re
+from collections import deque
+from operator import itemgetter
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict, Any
@@ -21,11 +24,25 @@ try:
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
 
-import subprocess
+import sys
 import threading
 
+# 共通定義はsrc配下から読み込む（main.pyと同じパス設定）
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+from config_core import CREATE_NO_WINDOW, M3U8_URL_RE, PROCESS_OUTPUT_TAIL_LINES, drain_stream
+
 logger = logging.getLogger(__name__)
 
+# Netscape形式Cookie出力用（ヘッダーと各Cookieの取り出し項目）
+_NETSCAPE_HEADER = (
+    "# Netscape HTTP Cookie File\n"
+    "# This file contains the cookies for TwitCasting authentication\n"
+)
+_COOKIE_FIELDS = itemgetter('domain', 'path', 'secure', 'name', 'value')
+
+# グループURLからID抽出
+_GROUP_ID_RE = re.compile(r'/g:([0-9]+)')
+
 class GroupStreamRecorder:
     """
     成功例完全踏襲・グループ配信特化録画エンジン
@@ -228,7 +245,7 @@ class GroupStreamRecorder:
             m3u8_url = None
             
             async def handle_response(response):
-                if ".m3u8" in response.url:
+                if M3U8_URL_RE.search(response.url):
                     nonlocal m3u8_url
                     m3u8_url = response.url
                     self.logger.info(f"SUCCESS: m3u8 URL検出: {response.url}")
@@ -276,21 +293,18 @@ class GroupStreamRecorder:
             cookies = await page.context.cookies()
             
             # Netscape形式で出力（成功例と同じ形式）
+            # Netscape形式: domain \t domain_flag \t path \t secure \t expires \t name \t value
+            rows = (
+                "%s\t%s\t%s\t%s\t%d\t%s\t%s\n" % (
+                    domain, "TRUE" if domain.startswith('.') else "FALSE", path,
+                    "TRUE" if secure else "FALSE", int(cookie.get('expires') or 0), name, value
+                )
+                for cookie in cookies
+                for domain, path, secure, name, value in (_COOKIE_FIELDS(cookie),)
+            )
             with open(cookie_file, 'w', encoding='utf-8') as f:
-                f.write("# Netscape HTTP Cookie File\n")
-                f.write("# This file contains the cookies for TwitCasting authentication\n")
-                
-                for cookie in cookies:
-                    # Netscape形式: domain \t domain_flag \t path \t secure \t expires \t name \t value
-                    domain = cookie['domain']
-                    domain_flag = "TRUE" if domain.startswith('.') else "FALSE"
-                    path = cookie['path']
-                    secure = "TRUE" if cookie['secure'] else "FALSE"
-                    expires = int(cookie.get('expires', 0)) if cookie.get('expires') else 0
-                    name = cookie['name']
-                    value = cookie['value']
-                    
-                    f.write(f"{domain}\t{domain_flag}\t{path}\t{secure}\t{expires}\t{name}\t{value}\n")
+                f.write(_NETSCAPE_HEADER)
+                f.writelines(rows)
             
             self.logger.info(f"SUCCESS: 新鮮なCookie出力完了: {cookie_file}")
             return cookie_file
@@ -314,22 +328,19 @@ class GroupStreamRecorder:
                 '--no-live-from-start',
                 '--format', 'best',
                 '--no-part',
-                '--no-mtime'
+                '--no-mtime',
+                '--no-progress'
             ]
             
             self.logger.info(f"RECORDING: yt-dlp録画開始: {group_id}")
             self.logger.debug(f"コマンド: {' '.join(cmd)}")
             
             # プロセス開始（成功例と同じ方式）
-            creation_flags = 0
-            if os.name == 'nt':
-                creation_flags = subprocess.CREATE_NO_WINDOW
-            
             process = await asyncio.create_subprocess_exec(
                 *cmd,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                creationflags=creation_flags
+                creationflags=CREATE_NO_WINDOW
             )
             
             self.logger.info(f"SUCCESS: 録画開始成功: {group_id}")
@@ -347,7 +358,13 @@ class GroupStreamRecorder:
         """録画プロセス監視（成功例踏襲・同期実行）"""
         try:
             self.logger.info(f"INFO: 録画プロセス監視開始: {group_id}")
-            stdout, stderr = await process.communicate()
+            # communicate()は全出力をメモリに溜めるため、逐次読み捨てて末尾のみ保持
+            stderr_tail = deque(maxlen=PROCESS_OUTPUT_TAIL_LINES)
+            await asyncio.gather(
+                drain_stream(process.stdout, deque(maxlen=1)),
+                drain_stream(process.stderr, stderr_tail)
+            )
+            await process.wait()
             
             if process.returncode == 0:
                 self.logger.info(f"SUCCESS: 録画完了: {group_id}")
@@ -363,8 +380,8 @@ class GroupStreamRecorder:
                     return False
             else:
                 self.logger.error(f"ERROR: 録画失敗: {group_id} (終了コード: {process.returncode})")
-                if stderr:
-                    error_output = stderr.decode('utf-8', errors='ignore')
+                if stderr_tail:
+                    error_output = b"".join(stderr_tail).decode('utf-8', errors='ignore')
                     self.logger.error(f"エラー詳細: {error_output}")
                 return False
         
@@ -374,8 +391,7 @@ class GroupStreamRecorder:
     def _extract_group_id(self, group_url: str) -> Optional[str]:
         """グループURLからID抽出"""
         try:
-            import re
-            match = re.search(r'/g:([0-9]+)', group_url)
+            match = _GROUP_ID_RE.search(group_url)
             if match:
                 return f"g_{match.group(1)}"
             
@@ -9,8 +9,10 @@ import asyncio
 import sys
 import os
 import logging
+import logging.handlers
 import signal
 import subprocess
+import shutil
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Protocol
 from datetime import datetime
@@ -27,7 +29,12 @@ except ImportError as e:
     PROCESS_MANAGER_AVAILABLE = False
     print(f"⚠️ ProcessManager未統合: {e}")
 
-# ログ設定
+# ログ設定（SystemConfigの既定値 log_rotation_size=10MB / log_retention_days=30 に合わせる）
+LOG_FILE = 'rakureko_twitcasting.log'
+LOG_ROTATION_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 30
+LOG_BUFFER_CAPACITY = 200
+
 def setup_logging(log_level: str = "INFO") -> logging.Logger:
     """最適化ログシステム"""
     numeric_level = getattr(logging, log_level.upper(), logging.INFO)
@@ -39,15 +46,22 @@ def setup_logging(log_level: str = "INFO") -> logging.Logger:
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.DEBUG)
     
-    # 既存ハンドラークリア
-    if root_logger.hasHandlers():
-        root_logger.handlers.clear()
+    # 既存ハンドラークリア（バッファ済みレコードを書き出してから閉じる）
+    for handler in root_logger.handlers[:]:
+        handler.close()
+    root_logger.handlers.clear()
     
-    # ファイルハンドラー
-    file_handler = logging.FileHandler('rakureko_twitcasting.log', encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
+    # ファイルハンドラー（サイズでローテーション、200件単位でまとめて書き込み・ERROR以上は即時）
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_ROTATION_BYTES, backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8', delay=True
+    )
     file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
+    buffered_handler = logging.handlers.MemoryHandler(
+        capacity=LOG_BUFFER_CAPACITY, flushLevel=logging.ERROR, target=file_handler
+    )
+    buffered_handler.setLevel(logging.DEBUG)
+    root_logger.addHandler(buffered_handler)
     
     # コンソールハンドラー
     console_handler = logging.StreamHandler()
@@ -294,6 +308,7 @@ class RakurekoTwitCastingOrchestrator:
                 self.config_manager, 
                 self.system_config
             )
+            await self.authenticated_recorder.async_init()
             logger.info("✅ 認証録画エンジン初期化完了")
         except ImportError as e:
             logger.error(f"❌ 認証録画エンジン初期化失敗: {e}")
@@ -889,8 +904,8 @@ class RakurekoTwitCastingOrchestrator:
         try:
             temp_dir = self.system_config.recordings_dir / "temp"
             if temp_dir.exists():
-                import shutil
-                shutil.rmtree(temp_dir, ignore_errors=True)
+                # 削除はスレッドで実行（イベントループを止めない）
+                await asyncio.to_thread(shutil.rmtree, temp_dir, True)
                 temp_dir.mkdir(exist_ok=True)
             
             logger.info("🧹 一時ファイルクリーンアップ完了")
@@ -942,7 +957,8 @@ class RakurekoTwitCastingOrchestrator:
             # 設定保存
             if self.config_manager:
                 try:
-                    self.config_manager.save_all_configs()
+                    # 書き込み完了まで待機（イベントループは止めない）
+                    await self.config_manager.save_all_configs_async()
                     logger.info("💾 設定保存完了")
                 except Exception as e:
                     logger.error(f"設定保存エラー: {e}")
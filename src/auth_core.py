@@ -15,13 +15,25 @@ from typing import Optional, Dict, List
 from http.cookiejar import MozillaCookieJar, Cookie
 import logging
 
+from config_core import M3U8_URL_RE
+
 # 依存関係インポート
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 try:
     from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
 
+# webdriver-managerのバージョン確認通信を抑制（インポート前に設定）
+os.environ.setdefault("WDM_LOCAL", "1")
+os.environ.setdefault("WDM_CACHE_VALID_RANGE", "30")
+
 try:
     from selenium import webdriver
     from selenium.webdriver.chrome.service import Service
@@ -37,6 +49,43 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# ChromeDriverパスキャッシュ（実行毎のバージョン確認を回避）
+_CACHED_DRIVER_PATH: Optional[str] = None
+
+# プロセス全体で共有するPlaywrightドライバー（Nodeプロセスを1つに保ち、最後の利用者の解放時に停止）
+_shared_pw = None
+_shared_pw_users: set = set()
+_shared_pw_lock: Optional[asyncio.Lock] = None
+
+async def acquire_playwright(owner):
+    """共有Playwrightドライバー取得（未起動なら起動し、ownerを利用者として登録）"""
+    global _shared_pw, _shared_pw_lock
+    if _shared_pw_lock is None:
+        _shared_pw_lock = asyncio.Lock()
+    async with _shared_pw_lock:
+        if _shared_pw is None:
+            _shared_pw = await async_playwright().start()
+        _shared_pw_users.add(id(owner))
+        return _shared_pw
+
+async def release_playwright(owner):
+    """共有Playwrightドライバーの利用終了（利用者がいなくなったら停止）"""
+    global _shared_pw
+    if _shared_pw_lock is None:
+        return
+    async with _shared_pw_lock:
+        _shared_pw_users.discard(id(owner))
+        if _shared_pw is not None and not _shared_pw_users:
+            await _shared_pw.stop()
+            _shared_pw = None
+
+# 障壁（年齢確認・合言葉）の有無を1回のCDP往復で判定するスクリプト
+_BARRIER_PROBE_JS = """() => ({
+    age: Array.from(document.querySelectorAll('button')).some(
+        b => b.offsetParent !== null && b.textContent.includes('はい')),
+    pwd: !!document.querySelector("input[name='password']")
+})"""
+
 class TwitCastingAuth:
     """TwitCasting認証管理（限定配信対応）"""
     
@@ -45,6 +94,22 @@ class TwitCastingAuth:
         self.cookies_json = self.base_dir / "twitcasting_cookies.json"
         self.cookies_txt = self.base_dir / "twitcasting_cookies.txt"
         self.user_data_dir = self.base_dir / "playwright_user_data"
+        self.storage_state_path = self.base_dir / "storage_state.json"
+        self.disk_cache_dir = self.base_dir / "chromium_disk_cache"
+        self.disk_cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Chromium起動引数（ディスクキャッシュを実行間で再利用）
+        self.chromium_args = [
+            '--no-sandbox',
+            '--disable-dev-shm-usage',
+            f'--disk-cache-dir={self.disk_cache_dir}',
+            '--disk-cache-size=104857600',
+            '--no-first-run',
+            '--no-default-browser-check',
+            '--disable-background-networking',
+            '--disable-features=Translate,BackForwardCache',
+            '--disable-blink-features=AutomationControlled',
+        ]
         
         # 認証情報
         self.email = os.getenv("TWITCASTING_EMAIL")
@@ -54,6 +119,14 @@ class TwitCastingAuth:
         # 設定
         self.cookie_refresh_hours = 24
         self.last_refresh = None
+    
+    async def get_playwright(self):
+        """共有Playwrightドライバー取得（未起動なら起動）"""
+        return await acquire_playwright(self)
+    
+    async def shutdown(self):
+        """共有Playwrightドライバーの利用終了（他の利用者がいなければ停止）"""
+        await release_playwright(self)
         
     def needs_refresh(self) -> bool:
         """Cookie更新が必要かチェック"""
@@ -66,12 +139,18 @@ class TwitCastingAuth:
         except Exception:
             return True
     
+    def _sync_load_cookies(self) -> Optional[List[Dict]]:
+        """Cookie JSON読み込み（同期・例外は呼び出し側で処理）"""
+        if not self.cookies_json.exists():
+            return None
+        with open(self.cookies_json, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
     def get_cookie_string(self) -> str:
         """Cookie文字列取得（streamlink/yt-dlp用）"""
         try:
-            if self.cookies_json.exists():
-                with open(self.cookies_json, 'r', encoding='utf-8') as f:
-                    cookies = json.load(f)
+            cookies = self._sync_load_cookies()
+            if cookies is not None:
                 return "; ".join([f"{c['name']}={c['value']}" for c in cookies])
         except Exception as e:
             logger.error(f"Cookie文字列取得エラー: {e}")
@@ -81,13 +160,15 @@ class TwitCastingAuth:
     def get_cookies(self) -> Optional[List[Dict]]:
         """Cookie情報取得"""
         try:
-            if self.cookies_json.exists():
-                with open(self.cookies_json, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            return self._sync_load_cookies()
         except Exception as e:
             logger.error(f"Cookie取得エラー: {e}")
         return None
     
+    async def _asave_cookies(self, cookies: List[Dict]) -> bool:
+        """Cookie保存（イベントループを塞がないようスレッドで実行）"""
+        return await asyncio.to_thread(self._save_cookies, cookies)
+    
     def get_netscape_cookies_path(self) -> str:
         """Netscape形式cookiesファイルパス取得"""
         return str(self.cookies_txt)
@@ -105,40 +186,45 @@ class TwitCastingAuth:
             logger.error("Playwright未インストール")
             return False
         
+        context = None
         try:
             self.user_data_dir.mkdir(exist_ok=True)
             
-            async with async_playwright() as p:
-                context = await p.chromium.launch_persistent_context(
-                    user_data_dir=self.user_data_dir,
-                    headless=headless,
-                    args=['--no-sandbox', '--disable-dev-shm-usage']
-                )
-                
-                page = context.pages[0] if context.pages else await context.new_page()
-                
-                # ログインページへ移動
-                await page.goto("https://twitcasting.tv/login", timeout=30000)
-                
-                # 既にログイン済みかチェック
-                if "login" not in page.url:
-                    logger.info("既にログイン済み")
-                else:
-                    # ログイン実行
-                    success = await self._perform_login_playwright(page)
-                    if not success:
-                        await context.close()
-                        return False
-                
-                # Cookie取得・保存
-                cookies = await context.cookies()
-                success = self._save_cookies(cookies)
-                
-                await context.close()
-                return success
+            p = await self.get_playwright()
+            context = await p.chromium.launch_persistent_context(
+                user_data_dir=self.user_data_dir,
+                headless=headless,
+                args=self.chromium_args
+            )
+            
+            page = context.pages[0] if context.pages else await context.new_page()
+            
+            # ログインページへ移動
+            await page.goto("https://twitcasting.tv/login", timeout=30000)
+            
+            # 既にログイン済みかチェック
+            if "login" not in page.url:
+                logger.info("既にログイン済み")
+            else:
+                # ログイン実行
+                success = await self._perform_login_playwright(page)
+                if not success:
+                    await context.close()
+                    return False
+            
+            # Cookie取得・保存（軽量コンテキスト用にstorage_stateも保存）
+            cookies = await context.cookies()
+            success = await self._asave_cookies(cookies)
+            await context.storage_state(path=str(self.storage_state_path))
+            
+            await context.close()
+            return success
                 
         except Exception as e:
             logger.error(f"Playwright Cookie更新エラー: {e}")
+            # 共有ドライバーは残るためプロファイルのロックを解放しておく
+            if context:
+                await context.close()
             return False
     
     async def _perform_login_playwright(self, page) -> bool:
@@ -190,7 +276,10 @@ class TwitCastingAuth:
             options.add_argument("--disable-dev-shm-usage")
             options.add_argument("--disable-gpu")
             
-            service = Service(ChromeDriverManager().install())
+            global _CACHED_DRIVER_PATH
+            if _CACHED_DRIVER_PATH is None or not os.path.exists(_CACHED_DRIVER_PATH):
+                _CACHED_DRIVER_PATH = ChromeDriverManager().install()
+            service = Service(_CACHED_DRIVER_PATH)
             driver = webdriver.Chrome(service=service, options=options)
             driver.set_page_load_timeout(30)
             
@@ -265,9 +354,13 @@ class TwitCastingAuth:
     def _save_cookies(self, cookies: List[Dict]) -> bool:
         """Cookie保存（JSON + Netscape形式）"""
         try:
-            # JSON形式保存
-            with open(self.cookies_json, 'w', encoding='utf-8') as f:
-                json.dump(cookies, f, indent=2, ensure_ascii=False)
+            # JSON形式保存（プログラム専用のためインデントなし）
+            if ORJSON_AVAILABLE:
+                data = orjson.dumps(cookies)
+            else:
+                data = json.dumps(cookies, ensure_ascii=False).encode('utf-8')
+            with open(self.cookies_json, 'wb') as f:
+                f.write(data)
             
             # Netscape形式保存
             cookie_jar = MozillaCookieJar(str(self.cookies_txt))
@@ -311,16 +404,21 @@ class TwitCastingAuth:
     async def handle_stream_barriers(self, page, password: str = None) -> bool:
         """配信の障壁突破（年齢制限・合言葉）"""
         try:
+            state = await page.evaluate(_BARRIER_PROBE_JS)
+            if not state['age'] and not state['pwd']:
+                return True
+            
             # 年齢確認
-            age_button = page.locator("button:visible", has_text="はい")
-            if await age_button.count() > 0:
+            if state['age']:
                 logger.info("年齢確認画面を突破")
-                await age_button.first.click()
+                await page.get_by_role("button", name="はい").first.click()
                 await page.wait_for_load_state('domcontentloaded', timeout=10000)
+                # 遷移後に合言葉画面が現れる場合があるため再判定
+                state = await page.evaluate(_BARRIER_PROBE_JS)
             
             # 合言葉入力
-            password_input = page.locator("input[name='password']")
-            if await password_input.count() > 0:
+            if state['pwd']:
+                password_input = page.locator("input[name='password']")
                 if password:
                     logger.info("合言葉を入力")
                     await password_input.fill(password)
@@ -339,16 +437,16 @@ class TwitCastingAuth:
     
     async def auto_refresh_if_needed(self, headless: bool = True) -> bool:
         """必要に応じて自動Cookie更新"""
-        if not self.needs_refresh():
+        if not await asyncio.to_thread(self.needs_refresh):
             return True
         
         logger.info("Cookie更新が必要です")
         
-        # Playwrightを優先、失敗時はSeleniumフォールバック
+        # Playwrightを優先、失敗時はSeleniumフォールバック（同期APIのためスレッドで実行）
         success = await self.refresh_cookies_playwright(headless)
         if not success and SELENIUM_AVAILABLE:
             logger.info("Playwrightが失敗、Seleniumで再試行")
-            success = self.refresh_cookies_selenium(headless)
+            success = await asyncio.to_thread(self.refresh_cookies_selenium, headless)
         
         if success:
             logger.info("Cookie更新成功")
@@ -374,94 +472,99 @@ class LimitedStreamAuth:
         if not PLAYWRIGHT_AVAILABLE:
             return {"success": False, "error": "Playwright未対応"}
         
+        context = None
         try:
             # ✅ 修正: Cookie事前確認と更新
             cookie_updated = await self.auth.auto_refresh_if_needed(headless)
             if not cookie_updated:
                 logger.warning("Cookie更新に失敗しましたが処理を続行します")
             
-            async with async_playwright() as p:
-                context = await p.chromium.launch_persistent_context(
-                    user_data_dir=self.auth.user_data_dir,
-                    headless=headless,
-                    args=['--no-sandbox', '--disable-dev-shm-usage']
-                )
-                
-                page = context.pages[0] if context.pages else await context.new_page()
+            p = await self.auth.get_playwright()
+            context = await p.chromium.launch_persistent_context(
+                user_data_dir=self.auth.user_data_dir,
+                headless=headless,
+                args=self.auth.chromium_args
+            )
+            
+            page = context.pages[0] if context.pages else await context.new_page()
+            
+            # 配信ページへ移動
+            logger.info(f"🔗 配信ページへアクセス: {url}")
+            await page.goto(url, timeout=30000)
+            
+            # 障壁突破
+            password = self.stream_passwords.get(url)
+            barrier_success = await self.auth.handle_stream_barriers(page, password)
+            
+            if not barrier_success:
+                await context.close()
+                return {"success": False, "error": "障壁突破失敗"}
+            
+            # ✅ 修正: m3u8検出の改良版
+            logger.info("📡 配信開始/m3u8検出を待機中...")
+            m3u8_url = None
+            
+            try:
+                # CDPのNetwork.responseReceivedでm3u8を検出（ポーリング不要）
+                m3u8_future = asyncio.get_running_loop().create_future()
                 
-                # 配信ページへ移動
-                logger.info(f"🔗 配信ページへアクセス: {url}")
-                await page.goto(url, timeout=30000)
+                def handle_response(params):
+                    response_url = params["response"]["url"]
+                    if M3U8_URL_RE.search(response_url) and not m3u8_future.done():
+                        m3u8_future.set_result(response_url)
                 
-                # 障壁突破
-                password = self.stream_passwords.get(url)
-                barrier_success = await self.auth.handle_stream_barriers(page, password)
+                cdp = await context.new_cdp_session(page)
+                cdp.on("Network.responseReceived", handle_response)
+                await cdp.send("Network.enable")
                 
-                if not barrier_success:
-                    await context.close()
-                    return {"success": False, "error": "障壁突破失敗"}
+                # 最大5分待機（30秒ごとにログ）
+                max_wait = 300  # 5分
+                log_interval = 30
                 
-                # ✅ 修正: m3u8検出の改良版
-                logger.info("📡 配信開始/m3u8検出を待機中...")
-                m3u8_url = None
+                for elapsed in range(log_interval, max_wait + log_interval, log_interval):
+                    try:
+                        m3u8_url = await asyncio.wait_for(asyncio.shield(m3u8_future), timeout=log_interval)
+                        logger.info(f"🎯 m3u8 URL検出: {m3u8_url}")
+                        break
+                    except asyncio.TimeoutError:
+                        logger.info(f"⏳ 待機中... {elapsed//60}分{elapsed%60}秒経過")
                 
+                m3u8_future.cancel()
                 try:
-                    # レスポンス監視でm3u8を検出
-                    async def handle_response(response):
-                        if ".m3u8" in response.url:
-                            nonlocal m3u8_url
-                            m3u8_url = response.url
-                            logger.info(f"🎯 m3u8 URL検出: {response.url}")
-                    
-                    page.on("response", handle_response)
-                    
-                    # 最大5分待機
-                    max_wait = 300  # 5分
-                    wait_interval = 5  # 5秒間隔
-                    
-                    for i in range(0, max_wait, wait_interval):
-                        if m3u8_url:
-                            break
-                        
-                        # ページを少しスクロールして活性化
-                        try:
-                            await page.evaluate("window.scrollBy(0, 100)")
-                            await asyncio.sleep(1)
-                            await page.evaluate("window.scrollBy(0, -100)")
-                        except:
-                            pass
-                        
-                        await asyncio.sleep(wait_interval)
-                        
-                        if i % 30 == 0:  # 30秒ごとにログ
-                            logger.info(f"⏳ 待機中... {i//60}分{i%60}秒経過")
-                    
-                    if not m3u8_url:
-                        # フォールバック: 直接URLを使用
-                        logger.warning("m3u8検出失敗、元URLを使用します")
-                        m3u8_url = url
-                    
-                    # 最新Cookie取得
-                    cookies = await context.cookies()
-                    cookie_header = "; ".join([f"{c['name']}={c['value']}" for c in cookies])
-                    
-                    await context.close()
-                    
-                    return {
-                        "success": True,
-                        "m3u8_url": m3u8_url,
-                        "cookie_header": cookie_header,
-                        "timestamp": datetime.now().isoformat(),
-                        "detected_via": "m3u8_response" if ".m3u8" in m3u8_url else "fallback_url"
-                    }
-                    
-                except Exception as e:
-                    await context.close()
-                    logger.error(f"m3u8検出処理エラー: {e}")
-                    return {"success": False, "error": f"m3u8検出エラー: {e}"}
+                    await cdp.detach()
+                except Exception:
+                    pass
+                
+                if not m3u8_url:
+                    # フォールバック: 直接URLを使用
+                    logger.warning("m3u8検出失敗、元URLを使用します")
+                    m3u8_url = url
+                
+                # 最新Cookie取得（期限更新されたCookieをstorage_stateへ反映）
+                cookies = await context.cookies()
+                cookie_header = "; ".join([f"{c['name']}={c['value']}" for c in cookies])
+                await context.storage_state(path=str(self.auth.storage_state_path))
+                
+                await context.close()
+                
+                return {
+                    "success": True,
+                    "m3u8_url": m3u8_url,
+                    "cookie_header": cookie_header,
+                    "timestamp": datetime.now().isoformat(),
+                    "detected_via": "m3u8_response" if M3U8_URL_RE.search(m3u8_url) else "fallback_url"
+                }
+                
+            except Exception as e:
+                await context.close()
+                logger.error(f"m3u8検出処理エラー: {e}")
+                return {"success": False, "error": f"m3u8検出エラー: {e}"}
         
         except Exception as e:
             logger.error(f"配信認証エラー: {e}")
+            # 共有ドライバーは残るためプロファイルのロックを解放しておく
+            if context:
+                await context.close()
             return {"success": False, "error": str(e)}
 
 
@@ -11,33 +11,161 @@ import json
 import time
 import uuid
 import os
+import errno
 import shutil
+import hashlib
+import shlex
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 from dataclasses import dataclass, field
-import subprocess
 import re
+import urllib.parse
+from collections import deque
+from functools import lru_cache
+from http.cookiejar import Cookie, MozillaCookieJar
 
 # 外部モジュールをインポート
 from recording_options import RecordingOptions
+from config_core import CREATE_NO_WINDOW, M3U8_URL_RE, PROCESS_OUTPUT_TAIL_LINES, drain_stream
 
 # auth_core.pyとの統合
 try:
-    from auth_core import TwitCastingAuth, LimitedStreamAuth
+    from auth_core import TwitCastingAuth, LimitedStreamAuth, acquire_playwright, release_playwright
     AUTH_CORE_AVAILABLE = True
 except ImportError:
     AUTH_CORE_AVAILABLE = False
 
 # Playwright依存関係
 try:
-    from playwright.async_api import async_playwright, BrowserContext, TimeoutError as PlaywrightTimeoutError
+    from playwright.async_api import BrowserContext, TimeoutError as PlaywrightTimeoutError
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# yt-dlp実行ファイル（起動毎のPATH探索を省くため解決結果を保持）
+YTDLP_EXECUTABLE = shutil.which('yt-dlp') or 'yt-dlp'
+
+# yt-dlp共通オプション（起動毎に変わらない引数）
+_YTDLP_BASE_ARGS = (
+    '--no-live-from-start',
+    '--format', 'best',  # 警告回避のため修正
+    '--no-part',
+    '--no-progress',
+    '--no-mtime',
+    '--add-header', 'Referer: https://twitcasting.tv/',
+    '--add-header', 'User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+)
+
+# 障壁処理用セレクタ（CSSユニオンで1回のDOM走査に集約）
+AGE_BUTTON_SELECTOR = "button:visible:has-text('はい')"
+PASSWORD_INPUT_SELECTOR = "input[name='password'], input[type='password']"
+PASSWORD_SUBMIT_SELECTOR = "button[type='submit'], input[type='submit']"
+# 障壁（年齢確認・合言葉入力）いずれかの出現待ち用
+BARRIER_SELECTOR = f"{AGE_BUTTON_SELECTOR}, {PASSWORD_INPUT_SELECTOR}"
+
+# 合言葉要求の有無をブラウザ内で判定（page.content()でDOM全体を転送しない）
+PASSWORD_PROMPT_PROBE_JS = """() => {
+    const t = document.body ? document.body.innerText : '';
+    return /password|パスワード|合言葉/i.test(t);
+}"""
+
+# 手動入力の検出（入力された時点で待機を終える）
+PASSWORD_FILLED_JS = "document.querySelector('input[type=password]')?.value.length > 0"
+
+# 配信URLからユーザー名を抽出
+_USERNAME_RE = re.compile(r'twitcasting\.tv/([^/?]+)')
+
+# Cookieヘッダー分割（"; " 以外の区切り揺れにも対応）
+_COOKIE_SPLIT_RE = re.compile(r';\s*')
+
+# m3u8検出に不要なリソース種別（スタイルシートは表示判定に必要なため対象外）
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+
+# 認証失効を示すyt-dlpエラー（キャッシュ破棄の判定用）
+_AUTH_ERROR_RE = re.compile(r'HTTP Error 403|cookie', re.IGNORECASE)
+
+def _write_private_file(path: Path, data: bytes):
+    """所有者のみ読み書き可能なファイルとして書き込み（セッションCookie保護）"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+@lru_cache(maxsize=1024)
+def _extract_username(url: str) -> str:
+    """URLからユーザー名抽出（同一URLは繰り返し参照されるためキャッシュ）"""
+    # 通常の配信URL
+    match = _USERNAME_RE.search(url)
+    if match:
+        return match.group(1)
+    
+    # フォールバック
+    return url.split('/')[-1].split('?')[0] if '/' in url else "unknown"
+
+def _format_duration(seconds: int) -> str:
+    """経過秒数をH:MM:SS形式に整形"""
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+def _move_file(src: Path, dst: Path):
+    """ファイル移動（同一FSはos.replace、別マウント間はコピー移動）"""
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+def _unlink_quiet(path: Path):
+    """ファイル削除（存在しなければ何もしない）"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def _write_netscape_cookies_sync(path: Path, header: str, domain: str):
+    """CookieヘッダーをNetscape形式で書き込み（スレッド実行用）"""
+    # Netscape形式: domain domain_specified path secure expires name value
+    # （セッションクッキーとしてexpires=0、ファイル全体を一括生成して単一書き込み）
+    lines = ["# Netscape HTTP Cookie File\n", "# This is a generated file! Do not edit.\n\n"]
+    lines.extend(
+        f"{domain}\tTRUE\t/\tFALSE\t0\t{name}\t{value}\n"
+        for name, _, value in (
+            pair.partition('=') for pair in _COOKIE_SPLIT_RE.split(header) if '=' in pair
+        )
+    )
+    _write_private_file(path, "".join(lines).encode('utf-8'))
+
+def _save_cookie_jar_sync(cookie_file: Path, cookies: List[Dict[str, Any]]):
+    """Playwright CookieをNetscape形式で原子的に保存（スレッド実行用）"""
+    # 標準ライブラリのMozillaCookieJarで書式・hostOnlyを正しく扱う
+    temp_file = cookie_file.with_suffix('.tmp')
+    jar = MozillaCookieJar(str(temp_file))
+    for cookie in cookies:
+        domain = cookie['domain']
+        if "twitcasting" not in domain:
+            continue
+        expires = cookie.get('expires', 0)
+        jar.set_cookie(Cookie(
+            version=0, name=cookie['name'], value=cookie['value'],
+            port=None, port_specified=False,
+            domain=domain, domain_specified=domain.startswith('.'),
+            domain_initial_dot=domain.startswith('.'),
+            path=cookie.get('path', '/'), path_specified=True,
+            secure=cookie.get('secure', False),
+            expires=int(expires) if expires and expires > 0 else None,
+            discard=False, comment=None, comment_url=None, rest={}, rfc2109=False
+        ))
+    
+    # 所有者のみ読み書き可能な状態で作成してから書き込み、
+    # 書きかけのファイルをyt-dlpが読まないよう原子的に置換
+    _write_private_file(temp_file, b"")
+    jar.save(ignore_discard=True, ignore_expires=True)
+    os.replace(temp_file, cookie_file)
+
 class SessionStatus:
     INITIALIZING = "initializing"
     BROWSER_STARTING = "browser_starting"
@@ -70,6 +198,12 @@ class AuthenticatedRecordingEngine:
     
     AGE_VERIFY_TIMEOUT = 3000
     PASSWORD_INPUT_TIMEOUT = 5000
+    BARRIER_PROBE_TIMEOUT = 2000
+    MANUAL_PASSWORD_TIMEOUT = 30000
+    # 認証結果の再利用期間（秒）
+    AUTH_CACHE_TTL = 30
+    # 障壁有無の記録の有効期間（秒）。期限切れ後は再判定する
+    CHANNEL_PROFILE_TTL = 24 * 60 * 60
     
     def __init__(self, config_manager, system_config):
         self.config_manager = config_manager
@@ -79,13 +213,32 @@ class AuthenticatedRecordingEngine:
         self.recordings_dir = self.system_config.recordings_dir / "videos"
         self.temp_dir = self.system_config.recordings_dir / "temp"
         self.cookies_dir = self.system_config.data_dir / "cookies"
-        self.browser_sessions_dir = self.system_config.data_dir / "browser_sessions"
+        # ログイン状態（Cookie+localStorage）のみを保持し、プロファイル全体は読み込まない
+        self.storage_state_path = self.system_config.data_dir / "storage_state.json"
+        # チャンネル毎のstorage_state（年齢確認・合言葉突破後の状態）
+        self.storage_states_dir = self.system_config.data_dir / "storage_states"
+        # チャンネル毎の障壁有無（年齢制限・合言葉）の記録
+        self.profiles_path = self.system_config.data_dir / "profiles.json"
         
-        for directory in [self.recordings_dir, self.temp_dir, self.cookies_dir, self.browser_sessions_dir]:
+        for directory in [self.recordings_dir, self.temp_dir, self.cookies_dir, self.storage_states_dir]:
             directory.mkdir(parents=True, exist_ok=True)
         
         self.active_sessions: Dict[str, RecordingSession] = {}
+        # URL→セッションの索引（停止時の線形探索を回避）
+        self._sessions_by_url: Dict[str, RecordingSession] = {}
+        # 認証結果キャッシュ（再試行時のブラウザ認証を省略）
+        self._auth_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
         self.playwright_instance = None
+        self._channel_profiles: Dict[str, Dict[str, Any]] = self._load_channel_profiles()
+        
+        # 共有ブラウザ（セッション毎にBrowserContextを払い出す）
+        self._shared_browser = None
+        self._browser_lock = asyncio.Lock()
+        self._context_semaphore = asyncio.Semaphore(self.system_config.max_concurrent_recordings)
+        
+        # バックグラウンドタスク参照（GCによる消失防止・シャットダウン時の待機用）
+        self._session_tasks: set = set()
+        self._monitor_tasks: set = set()
         
         # ✅ 修正: auth_core.pyとの統合
         self.auth_manager = None
@@ -100,22 +253,87 @@ class AuthenticatedRecordingEngine:
         
         self.logger.info("認証付き録画エンジン初期化完了（Phase 1修正版）")
     
-    def _extract_username(self, url: str) -> str:
-        """✅ 修正: URLからユーザー名抽出"""
+    async def get_playwright(self):
+        """共有Playwrightドライバー取得（auth_coreと同一のドライバー、初回のみ起動）"""
+        return await acquire_playwright(self)
+
+    async def async_init(self):
+        """非同期初期化（Playwrightドライバーを事前起動し初回録画の待ち時間を削減）"""
+        if not PLAYWRIGHT_AVAILABLE:
+            return
         try:
-            # 通常の配信URL
-            match = re.search(r'twitcasting\.tv/([^/\?]+)', url)
-            if match:
-                return match.group(1)
-            
-            # フォールバック
-            return url.split('/')[-1].split('?')[0] if '/' in url else "unknown"
-        except Exception:
-            return "unknown"
+            self.playwright_instance = await self.get_playwright()
+            self.logger.info("✅ Playwrightドライバー起動")
+        except Exception as e:
+            # 失敗時は初回セッションで再試行
+            self.logger.warning(f"Playwrightドライバー事前起動失敗: {e}")
+
+    def _load_channel_profiles(self) -> Dict[str, Dict[str, Any]]:
+        """チャンネルプロファイル読み込み"""
+        try:
+            if self.profiles_path.exists():
+                return json.loads(self.profiles_path.read_text(encoding='utf-8') or '{}')
+        except Exception as e:
+            self.logger.warning(f"チャンネルプロファイル読み込みエラー: {e}")
+        return {}
+
+    def _save_channel_profiles(self):
+        """チャンネルプロファイル保存（原子的書き込み）"""
+        temp_path = self.profiles_path.with_suffix('.tmp')
+        try:
+            temp_path.write_text(
+                json.dumps(self._channel_profiles, indent=2, ensure_ascii=False, sort_keys=True),
+                encoding='utf-8'
+            )
+            os.replace(temp_path, self.profiles_path)
+        except Exception as e:
+            self.logger.warning(f"チャンネルプロファイル保存エラー: {e}")
+
+    def _storage_state_path_for(self, username: str) -> Optional[str]:
+        """チャンネル別storage_state（未保存時は共通ログイン状態）のパス"""
+        for path in (self.storage_states_dir / f"{username}.json", self.storage_state_path):
+            if path.exists():
+                return str(path)
+        return None
+
+    @staticmethod
+    def _auth_cache_key(url: str, password: Optional[str]) -> Tuple[str, str]:
+        """認証キャッシュキー（パスワードはハッシュ化して保持）"""
+        return url, hashlib.sha256((password or '').encode('utf-8')).hexdigest()
+
+    def _get_cached_auth(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """有効期限内の認証結果を取得"""
+        entry = self._auth_cache.get(key)
+        if entry is None:
+            return None
+        cached_at, auth_result = entry
+        if time.monotonic() - cached_at >= self.AUTH_CACHE_TTL:
+            del self._auth_cache[key]
+            return None
+        return auth_result
+
+    def _store_auth_cache(self, key: Tuple[str, str], auth_result: Dict[str, Any]):
+        """認証結果を保存（期限切れのエントリを併せて削除し、認証済みURL数に比例して肥大化させない）"""
+        now = time.monotonic()
+        expired = [k for k, (cached_at, _) in self._auth_cache.items() if now - cached_at >= self.AUTH_CACHE_TTL]
+        for k in expired:
+            del self._auth_cache[k]
+        self._auth_cache[key] = (now, auth_result)
+
+    def _invalidate_auth_cache(self, url: str):
+        """指定URLの認証結果を破棄"""
+        for key in [key for key in self._auth_cache if key[0] == url]:
+            del self._auth_cache[key]
+
+    def _track_task(self, task_set: set, coro) -> asyncio.Task:
+        """タスクを生成し、完了まで参照を保持"""
+        task = asyncio.create_task(coro)
+        task_set.add(task)
+        task.add_done_callback(task_set.discard)
+        return task
 
     def _generate_session_id(self, url: str) -> str:
         """セッションID生成"""
-        username = self._extract_username(url)
         timestamp = int(time.time())
         unique_id = str(uuid.uuid4())[:8]
         return f"session_{timestamp}_{unique_id}"
@@ -123,7 +341,7 @@ class AuthenticatedRecordingEngine:
     async def start_authenticated_recording(self, url: str, options: RecordingOptions) -> bool:
         """認証付き録画開始"""
         try:
-            username = self._extract_username(url)
+            username = _extract_username(url)
             session_id = options.session_name or self._generate_session_id(url)
             
             self.logger.info(f"🔐 認証付き録画開始: {username} (セッション: {session_id})")
@@ -137,8 +355,9 @@ class AuthenticatedRecordingEngine:
                 start_time=datetime.now(), status=SessionStatus.INITIALIZING
             )
             self.active_sessions[session_id] = session
+            self._sessions_by_url[url] = session
             
-            asyncio.create_task(self._execute_recording_session_with_retry(session, options))
+            self._track_task(self._session_tasks, self._execute_recording_session_with_retry(session, options))
             
             return True
             
@@ -180,16 +399,24 @@ class AuthenticatedRecordingEngine:
             
             # ✅ 修正: auth_core.pyを使用した認証
             if self.limited_auth and AUTH_CORE_AVAILABLE:
-                self.logger.info(f"🔐 auth_core認証開始: {session.username}")
-                
-                # パスワード設定
-                if options.password:
-                    self.limited_auth.set_stream_password(session.url, options.password)
+                cache_key = self._auth_cache_key(session.url, options.password)
+                auth_result = self._get_cached_auth(cache_key)
                 
-                # 配信認証実行
-                auth_result = await self.limited_auth.authenticate_for_stream(
-                    session.url, headless=options.headless
-                )
+                if auth_result:
+                    self.logger.info(f"♻️ 認証結果を再利用: {session.username}")
+                else:
+                    self.logger.info(f"🔐 auth_core認証開始: {session.username}")
+                    
+                    # パスワード設定
+                    if options.password:
+                        self.limited_auth.set_stream_password(session.url, options.password)
+                    
+                    # 配信認証実行
+                    auth_result = await self.limited_auth.authenticate_for_stream(
+                        session.url, headless=options.headless
+                    )
+                    if auth_result["success"]:
+                        self._store_auth_cache(cache_key, auth_result)
                 
                 if auth_result["success"]:
                     session.m3u8_url = auth_result["m3u8_url"]
@@ -233,38 +460,24 @@ class AuthenticatedRecordingEngine:
                 await self._create_netscape_cookie_file_fixed(cookie_file, session.cookie_header, session.url)
             
             # yt-dlpコマンド構築（完全修正版）
-            cmd = [
-                'yt-dlp',
-                session.m3u8_url or session.url,
-                '--output', str(output_file),
-                '--no-live-from-start',
-                '--format', 'best',  # 警告回避のため修正
-                '--no-part',
-                '--no-mtime',
-                '--add-header', 'Referer: https://twitcasting.tv/',
-                '--add-header', 'User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            ]
+            cmd = [YTDLP_EXECUTABLE, session.m3u8_url or session.url, '--output', str(output_file), *_YTDLP_BASE_ARGS]
             
             if cookie_file and cookie_file.exists():
                 cmd.extend(['--cookies', str(cookie_file)])
             
             self.logger.info(f"🎬 yt-dlp録画開始: {session.username}")
-            self.logger.debug(f"yt-dlpコマンド: {' '.join(cmd)}")
-            
-            # プロセス作成フラグ（Windows対応）
-            creation_flags = 0
-            if os.name == 'nt':
-                creation_flags = subprocess.CREATE_NO_WINDOW
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug("yt-dlpコマンド: %s", shlex.join(cmd))
             
             session.process = await asyncio.create_subprocess_exec(
                 *cmd, 
                 stdout=asyncio.subprocess.PIPE, 
                 stderr=asyncio.subprocess.PIPE, 
-                creationflags=creation_flags
+                creationflags=CREATE_NO_WINDOW
             )
             
             # プロセス監視開始
-            asyncio.create_task(self._monitor_recording_process(session, cookie_file))
+            self._track_task(self._monitor_tasks, self._monitor_recording_process(session, cookie_file))
             return True
             
         except Exception as e:
@@ -274,33 +487,15 @@ class AuthenticatedRecordingEngine:
     async def _create_netscape_cookie_file_fixed(self, cookie_file: Path, cookie_header: str, url: str):
         """✅ 完全修正: Netscape形式Cookieファイル作成（yt-dlp互換）"""
         try:
-            # ドメイン抽出
-            import urllib.parse
-            parsed_url = urllib.parse.urlparse(url)
-            domain = parsed_url.netloc
-            
-            # ドメインの正規化
+            # ドメイン抽出・正規化
+            domain = urllib.parse.urlparse(url).netloc
             if not domain.startswith('.'):
                 domain = f".{domain}"
             
-            # Netscape形式でCookieファイル作成
-            with open(cookie_file, 'w', encoding='utf-8') as f:
-                f.write("# Netscape HTTP Cookie File\n")
-                f.write("# This is a generated file! Do not edit.\n\n")
-                
-                for cookie_pair in cookie_header.split('; '):
-                    if '=' in cookie_pair:
-                        name, value = cookie_pair.split('=', 1)
-                        # 正しいNetscape形式: domain domain_specified path secure expires name value
-                        # domain_specified: ドメインが . で始まる場合は TRUE
-                        domain_specified = 'TRUE'
-                        path = '/'
-                        secure = 'FALSE'
-                        expires = '0'  # セッションクッキー
-                        
-                        f.write(f"{domain}\t{domain_specified}\t{path}\t{secure}\t{expires}\t{name}\t{value}\n")
-            
-            self.logger.debug(f"✅ 修正版Netscape Cookieファイル作成: {cookie_file}")
+            # ディスク書き込みでイベントループ（他セッションの監視）を止めない
+            await asyncio.to_thread(_write_netscape_cookies_sync, cookie_file, cookie_header, domain)
+            
+            self.logger.debug("✅ 修正版Netscape Cookieファイル作成: %s", cookie_file)
             
         except Exception as e:
             self.logger.error(f"❌ Cookieファイル作成エラー: {e}")
@@ -311,108 +506,187 @@ class AuthenticatedRecordingEngine:
             self.logger.error("PlaywrightもAuth coreも利用できません")
             return False
         
-        page = None
-        try:
-            session.status = SessionStatus.BROWSER_STARTING
-            await self._ensure_browser_session(session, options)
-            
-            session.status = SessionStatus.AUTHENTICATING
-            page = await session.browser_context.new_page()
-            
-            await page.goto(session.url, timeout=30000)
-            await self._handle_stream_barriers(page, options.password)
-            
-            session.status = SessionStatus.WAITING_FOR_STREAM
-            m3u8_url = await self._wait_for_stream_start(page, session.username, options.timeout_minutes)
-            
-            if not m3u8_url:
-                session.status = SessionStatus.FAILED
+        async with self._context_semaphore:
+            try:
+                session.status = SessionStatus.BROWSER_STARTING
+                await self._ensure_browser_session(session, options)
+                
+                session.status = SessionStatus.AUTHENTICATING
+                page = await session.browser_context.new_page()
+                
+                await page.goto(session.url, timeout=30000)
+                await self._handle_stream_barriers(page, options.password, session.username)
+                
+                session.status = SessionStatus.WAITING_FOR_STREAM
+                m3u8_url = await self._wait_for_stream_start(page, session.username, options.timeout_minutes)
+                
+                if not m3u8_url:
+                    # 障壁の判定誤りで検出できなかった可能性があるため記録を破棄
+                    self._channel_profiles.pop(session.username, None)
+                    session.status = SessionStatus.FAILED
+                    return False
+                
+                session.status = SessionStatus.RECORDING
+                cookie_file = await self._export_fresh_cookies(session, page)
+                # 期限更新されたCookieを次回以降のコンテキストへ引き継ぐ
+                await session.browser_context.storage_state(
+                    path=str(self.storage_states_dir / f"{session.username}.json")
+                )
+                return await self._start_ytdlp_recording(session, cookie_file, options)
+                
+            except Exception as e:
+                session.last_error = str(e)
+                self.logger.error(f"❌ フォールバック録画エラー: {session.username} - {e}", exc_info=True)
                 return False
-            
-            session.status = SessionStatus.RECORDING
-            cookie_file = await self._export_fresh_cookies(session, page)
-            return await self._start_ytdlp_recording(session, cookie_file, options)
-            
-        except Exception as e:
-            session.last_error = str(e)
-            self.logger.error(f"❌ フォールバック録画エラー: {session.username} - {e}", exc_info=True)
-            return False
-            
-        finally:
-            if page:
-                await page.close()
+                
+            finally:
+                # Cookie出力後はコンテキスト不要（録画はyt-dlpが継続）
+                if session.browser_context:
+                    await session.browser_context.close()
+                    session.browser_context = None
     
     async def _ensure_browser_session(self, session: RecordingSession, options: RecordingOptions):
-        """ブラウザセッション確保"""
+        """ブラウザセッション確保（共有ブラウザ上に隔離コンテキストを作成）"""
         try:
-            if self.playwright_instance is None:
-                self.playwright_instance = await async_playwright().start()
-            
-            session_dir = self.browser_sessions_dir / session.session_id
-            session_dir.mkdir(parents=True, exist_ok=True)
-            
-            session.browser_context = await self.playwright_instance.chromium.launch_persistent_context(
-                user_data_dir=str(session_dir),
-                headless=options.headless,
-                args=['--disable-blink-features=AutomationControlled', '--no-sandbox']
+            # 同時開始したセッションがブラウザを二重起動しないよう排他
+            async with self._browser_lock:
+                if self.playwright_instance is None:
+                    self.playwright_instance = await self.get_playwright()
+                
+                if self._shared_browser is None or not self._shared_browser.is_connected():
+                    self._shared_browser = await self.playwright_instance.chromium.launch(
+                        headless=options.headless,
+                        args=['--disable-blink-features=AutomationControlled', '--no-sandbox']
+                    )
+                    self.logger.info("✅ 共有ブラウザ起動")
+            
+            session.browser_context = await self._shared_browser.new_context(
+                storage_state=self._storage_state_path_for(session.username)
             )
+            await session.browser_context.route("**/*", self._block_heavy_resources)
             self.logger.info(f"✅ ブラウザセッション作成: {session.session_id}")
         except Exception as e:
             self.logger.error(f"❌ ブラウザセッション作成エラー: {e}", exc_info=True)
             raise
 
-    async def _handle_stream_barriers(self, page, password: Optional[str]):
-        """配信障壁処理"""
+    async def _block_heavy_resources(self, route):
+        """画像・フォント・メディアの取得を中止（m3u8は必ず通す）"""
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES and not M3U8_URL_RE.search(request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _handle_stream_barriers(self, page, password: Optional[str], username: str):
+        """配信障壁処理（障壁なしと記録済みのチャンネルは判定を省略）"""
         try:
-            await self._handle_age_verification(page)
+            profile = self._channel_profiles.setdefault(username, {})
+            now = time.time()
+            if now - profile.get('checked_at', 0) > self.CHANNEL_PROFILE_TTL:
+                # 期限切れの記録は破棄して全障壁を再判定
+                profile.clear()
+                profile['checked_at'] = now
+            
+            if password or profile.get('age_gated', True):
+                # 配信中ページはHLS取得が続きnetworkidleにならないため、障壁要素の出現を短時間だけ待つ
+                await page.wait_for_load_state("domcontentloaded")
+                try:
+                    await page.locator(BARRIER_SELECTOR).first.wait_for(
+                        state="attached", timeout=self.BARRIER_PROBE_TIMEOUT
+                    )
+                except PlaywrightTimeoutError:
+                    self.logger.debug("障壁要素なし、判定を続行")
+            
+            if profile.get('age_gated', True):
+                profile['age_gated'] = await self._handle_age_verification(page)
+            # 合言葉は配信毎に設定され得るため、指定時は常に入力を試みる
             if password:
-                await self._handle_password_input(page, password)
+                profile['password_gated'] = await self._handle_password_input(page, password)
         except Exception as e:
             self.logger.error(f"障壁処理エラー: {e}")
 
-    async def _handle_age_verification(self, page):
-        """年齢制限確認処理"""
+    async def _handle_age_verification(self, page) -> bool:
+        """年齢制限確認処理（年齢確認画面を検出したらTrue）"""
         try:
             # 年齢確認ボタンを探す
-            age_button = page.locator("button:visible", has_text="はい")
+            age_button = page.locator(AGE_BUTTON_SELECTOR)
             if await age_button.count() > 0:
                 self.logger.info("🔞 年齢確認画面を突破")
                 await age_button.first.click()
                 await page.wait_for_load_state('domcontentloaded', timeout=self.AGE_VERIFY_TIMEOUT)
+                return True
+            return False
         except Exception as e:
             self.logger.warning(f"年齢確認処理エラー: {e}")
+            return True
 
-    async def _handle_password_input(self, page, password: str):
-        """パスワード入力処理"""
+    async def _handle_password_input(self, page, password: str) -> bool:
+        """パスワード入力処理（合言葉の要求を検出したらTrue）"""
         try:
             self.logger.info("🔑 限定配信パスワード入力処理開始")
             
-            password_input = page.locator("input[name='password']")
+            password_input = page.locator(PASSWORD_INPUT_SELECTOR)
             if await password_input.count() > 0:
-                await password_input.fill(password)
+                await password_input.first.fill(password)
                 
-                submit_button = page.locator("button[type='submit']")
+                submit_button = page.locator(PASSWORD_SUBMIT_SELECTOR)
                 if await submit_button.count() > 0:
                     await submit_button.first.click()
                     await page.wait_for_load_state('domcontentloaded', timeout=self.PASSWORD_INPUT_TIMEOUT)
                     self.logger.info("✅ パスワード入力完了")
+                return True
+            elif await page.evaluate(PASSWORD_PROMPT_PROBE_JS):
+                self.logger.warning("⚠️ 合言葉の要求を検出しましたが入力欄を特定できません（手動入力待機）")
+                try:
+                    await page.wait_for_function(PASSWORD_FILLED_JS, timeout=self.MANUAL_PASSWORD_TIMEOUT)
+                except PlaywrightTimeoutError:
+                    self.logger.warning("⚠️ 手動入力待機タイムアウト")
+                    return True
+                
+                # 入力検出後は送信まで自動で行う
+                submit_button = page.locator(PASSWORD_SUBMIT_SELECTOR)
+                if await submit_button.count() > 0:
+                    await submit_button.first.click()
+                else:
+                    await page.keyboard.press("Enter")
+                await page.wait_for_load_state('domcontentloaded', timeout=self.PASSWORD_INPUT_TIMEOUT)
+                self.logger.info("✅ 手動パスワード入力完了")
+                return True
+            return False
         except Exception as e:
             self.logger.error(f"パスワード入力エラー: {e}")
+            return True
 
     async def _wait_for_stream_start(self, page, username: str, timeout_minutes: int) -> Optional[str]:
         """✅ 修正: 配信開始待機"""
         self.logger.info(f"📡 配信開始待機中: {username}")
+        cdp = None
         try:
-            async with page.expect_response(
-                lambda res: '.m3u8' in res.url, 
-                timeout=timeout_minutes * 60000
-            ) as res_info:
-                response = await res_info.value
-                self.logger.info(f"🎯 m3u8 URL検出: {username}")
-                return response.url
+            # CDPのNetwork.responseReceivedで検出（Response オブジェクトを生成・蓄積しない）
+            m3u8_future = asyncio.get_running_loop().create_future()
+            
+            def handle_response(params):
+                response_url = params["response"]["url"]
+                if M3U8_URL_RE.search(response_url) and not m3u8_future.done():
+                    m3u8_future.set_result(response_url)
+            
+            cdp = await page.context.new_cdp_session(page)
+            cdp.on("Network.responseReceived", handle_response)
+            await cdp.send("Network.enable")
+            
+            m3u8_url = await asyncio.wait_for(m3u8_future, timeout=timeout_minutes * 60)
+            self.logger.info(f"🎯 m3u8 URL検出: {username}")
+            return m3u8_url
         except Exception:
             self.logger.error(f"❌ 配信検出失敗: {username}")
             return None
+        finally:
+            if cdp:
+                try:
+                    await cdp.send("Network.disable")
+                    await cdp.detach()
+                except Exception:
+                    pass
 
     async def _export_fresh_cookies(self, session: RecordingSession, page) -> Path:
         """新鮮なCookie取得（修正版）"""
@@ -422,25 +696,8 @@ class AuthenticatedRecordingEngine:
             # ページからCookie取得
             cookies = await session.browser_context.cookies()
             
-            # Netscape形式で保存（修正版）
-            with open(cookie_file, 'w', encoding='utf-8') as f:
-                f.write("# Netscape HTTP Cookie File\n")
-                f.write("# This is a generated file! Do not edit.\n\n")
-                
-                for cookie in cookies:
-                    # domain_specifiedの正しい設定
-                    domain = cookie['domain']
-                    if not domain.startswith('.'):
-                        domain = f".{domain}"
-                    
-                    domain_specified = 'TRUE'
-                    path = cookie.get('path', '/')
-                    secure = 'TRUE' if cookie.get('secure', False) else 'FALSE'
-                    expires = str(cookie.get('expires', 0))
-                    name = cookie['name']
-                    value = cookie['value']
-                    
-                    f.write(f"{domain}\t{domain_specified}\t{path}\t{secure}\t{expires}\t{name}\t{value}\n")
+            # Netscape形式で保存（ディスク書き込みはスレッドで実行）
+            await asyncio.to_thread(_save_cookie_jar_sync, cookie_file, cookies)
             
             self.logger.info(f"🍪 修正版Cookie出力完了: {cookie_file}")
             return cookie_file
@@ -456,28 +713,18 @@ class AuthenticatedRecordingEngine:
             output_file = self.temp_dir / f"{session.username}_{timestamp}.mp4"
             session.output_file = output_file
             
-            cmd = [
-                'yt-dlp', 
-                session.url, 
-                '--output', str(output_file), 
-                '--no-live-from-start',
-                '--format', 'best', 
-                '--no-part',
-                '--add-header', 'Referer: https://twitcasting.tv/',
-                '--add-header', 'User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            ]
+            cmd = [YTDLP_EXECUTABLE, session.url, '--output', str(output_file), *_YTDLP_BASE_ARGS]
             
             if cookie_file and cookie_file.exists():
                 cmd.extend(['--cookies', str(cookie_file)])
             
             self.logger.info(f"🎬 yt-dlp録画開始: {session.username}")
             
-            creation_flags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
             session.process = await asyncio.create_subprocess_exec(
-                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, creationflags=creation_flags
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, creationflags=CREATE_NO_WINDOW
             )
             
-            asyncio.create_task(self._monitor_recording_process(session, cookie_file))
+            self._track_task(self._monitor_tasks, self._monitor_recording_process(session, cookie_file))
             return True
         except Exception as e:
             self.logger.error(f"yt-dlp録画開始エラー: {e}")
@@ -489,21 +736,33 @@ class AuthenticatedRecordingEngine:
             if not session.process: 
                 return
             
-            stdout, stderr = await session.process.communicate()
+            # stdout/stderrを並行して読み捨て（パイプ詰まり防止・末尾のみ保持）
+            stdout_tail = deque(maxlen=PROCESS_OUTPUT_TAIL_LINES)
+            stderr_tail = deque(maxlen=PROCESS_OUTPUT_TAIL_LINES)
+            await asyncio.gather(
+                drain_stream(session.process.stdout, stdout_tail),
+                drain_stream(session.process.stderr, stderr_tail)
+            )
+            await session.process.wait()
             
             if session.process.returncode == 0:
                 session.status = SessionStatus.COMPLETED
                 self.logger.info(f"✅ 録画完了: {session.username}")
                 
-                # 一時ファイルから最終ディレクトリに移動
-                if session.output_file and session.output_file.exists():
+                # 一時ファイルから最終ディレクトリに移動（存在確認は移動の失敗で代替）
+                if session.output_file:
                     final_file = self.recordings_dir / session.output_file.name
-                    session.output_file.rename(final_file)
-                    session.output_file = final_file
-                    self.logger.info(f"📁 ファイル移動完了: {final_file}")
+                    try:
+                        await asyncio.to_thread(_move_file, session.output_file, final_file)
+                        session.output_file = final_file
+                        self.logger.info(f"📁 ファイル移動完了: {final_file}")
+                    except FileNotFoundError:
+                        self.logger.warning(f"⚠️ 録画ファイルが存在しません: {session.output_file}")
             else:
                 session.status = SessionStatus.FAILED
-                error_msg = stderr.decode('utf-8', errors='ignore')
+                error_msg = b"".join(stderr_tail).decode('utf-8', errors='ignore')
+                if _AUTH_ERROR_RE.search(error_msg):
+                    self._invalidate_auth_cache(session.url)
                 self.logger.error(f"❌ 録画失敗: {session.username} (code: {session.process.returncode})")
                 self.logger.error(f"エラー詳細: {error_msg}")
         
@@ -513,25 +772,29 @@ class AuthenticatedRecordingEngine:
         
         finally:
             # クリーンアップ
-            if cookie_file and cookie_file.exists():
-                try:
-                    cookie_file.unlink()
-                except:
-                    pass
-            await self._cleanup_session(session)
+            await self._cleanup_session(session, cookie_file)
 
-    async def _cleanup_session(self, session: RecordingSession):
+    async def _cleanup_session(self, session: RecordingSession, cookie_file: Optional[Path] = None):
         """✅ 修正: セッションクリーンアップ"""
         try:
+            # コンテキストのみ閉じる（共有ブラウザはshutdownで終了）
+            # Cookieファイル削除（スレッド実行）と並行して行う
+            cleanup_steps = []
             if session.browser_context:
-                await session.browser_context.close()
+                cleanup_steps.append(session.browser_context.close())
+                session.browser_context = None
+            if cookie_file:
+                cleanup_steps.append(asyncio.to_thread(_unlink_quiet, cookie_file))
             
-            session_dir = self.browser_sessions_dir / session.session_id
-            if session_dir.exists():
-                shutil.rmtree(session_dir, ignore_errors=True)
+            results = await asyncio.gather(*cleanup_steps, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    self.logger.warning(f"クリーンアップ処理エラー: {result}")
             
-            if session.session_id in self.active_sessions:
-                del self.active_sessions[session.session_id]
+            self.active_sessions.pop(session.session_id, None)
+            # 同一URLで新しいセッションが登録済みの場合は残す
+            if self._sessions_by_url.get(session.url) is session:
+                del self._sessions_by_url[session.url]
             
             self.logger.info(f"🧹 セッションクリーンアップ完了: {session.session_id}")
         except Exception as e:
@@ -540,11 +803,7 @@ class AuthenticatedRecordingEngine:
     async def stop_recording(self, url: str) -> bool:
         """録画停止"""
         try:
-            target_session = None
-            for session in self.active_sessions.values():
-                if session.url == url:
-                    target_session = session
-                    break
+            target_session = self._sessions_by_url.get(url)
             
             if not target_session:
                 self.logger.warning(f"停止対象が見つかりません: {url}")
@@ -570,13 +829,14 @@ class AuthenticatedRecordingEngine:
 
     def get_active_recordings(self) -> Dict[str, Any]:
         """アクティブな録画一覧取得"""
+        now = datetime.now()
         return {
             session_id: {
                 'url': session.url,
                 'username': session.username,
                 'status': session.status,
                 'start_time': session.start_time.isoformat() if session.start_time else None,
-                'duration': str(datetime.now() - session.start_time).split('.')[0] if session.start_time else "0:00:00"
+                'duration': _format_duration(int((now - session.start_time).total_seconds())) if session.start_time else "0:00:00"
             }
             for session_id, session in self.active_sessions.items()
         }
@@ -585,12 +845,33 @@ class AuthenticatedRecordingEngine:
         """シャットダウン"""
         self.logger.info("認証付き録画エンジンシャットダウン")
         
-        # 全録画停止
+        # 認証・待機中のセッションを中断（停止後にyt-dlpが起動しないように）
+        for task in list(self._session_tasks):
+            task.cancel()
+        await asyncio.gather(*self._session_tasks, return_exceptions=True)
+        
+        # 全録画停止（終了猶予の待機を並行化）
         sessions_to_stop = list(self.active_sessions.values())
-        for session in sessions_to_stop:
-            await self.stop_recording(session.url)
+        await asyncio.gather(
+            *(self.stop_recording(session.url) for session in sessions_to_stop),
+            return_exceptions=True
+        )
+        
+        # 監視タスクの完了（ファイル移動・Cookie削除）を待機
+        await asyncio.gather(*self._monitor_tasks, return_exceptions=True)
+        
+        self._save_channel_profiles()
+        
+        # auth_coreの共有Playwrightドライバー利用終了
+        if self.auth_manager:
+            await self.auth_manager.shutdown()
+        
+        # 共有ブラウザ終了
+        if self._shared_browser:
+            await self._shared_browser.close()
+            self._shared_browser = None
         
-        # Playwright終了
+        # 共有Playwrightドライバーの利用終了（他のエンジン・auth_coreが使用中なら停止しない）
         if self.playwright_instance:
-            await self.playwright_instance.stop()
+            await release_playwright(self)
             self.playwright_instance = None
\ No newline at end of file
@@ -8,23 +8,121 @@ config_core.py - 設定管理コア（完全対応修正版）
 import os
 import sys
 import json
+import re
+import hashlib
+import mmap
+import time
+import pickle
+import tempfile
+import shutil
 import yaml
 import logging
 import asyncio
 import subprocess
 import platform
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Union, Mapping, Tuple
+from dataclasses import dataclass, field, fields, replace
 
-# Windows固有の処理
-CREATE_NO_WINDOW = 0x08000000 if platform.system() == "Windows" else 0
+# YAML C実装（libyaml）が利用可能なら使用
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
+# 高速JSON（オプション）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# この大きさ以上の設定ファイルはmmap経由でlibyamlに渡す（小さいファイルは通常読み込みの方が速い）
+MMAP_THRESHOLD_BYTES = 4096
+
+# Windows固有の処理（プラットフォーム判定は起動時に一度だけ）
+IS_WINDOWS = platform.system() == "Windows"
+CREATE_NO_WINDOW = 0x08000000 if IS_WINDOWS else 0
+
+def _default_file_mode() -> int:
+    """新規ファイルの既定パーミッション（umask適用後）"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+# 原子的書き込みで新規作成するファイルのパーミッション（mkstempの0600を置き換える）
+DEFAULT_FILE_MODE = _default_file_mode()
+
+# m3u8 URL判定（xm3u8log.js等の部分一致を除外し、.m3u8/?video=1 のような後続パスは許容）
+M3U8_URL_RE = re.compile(r"\.m3u8(?:[/?#]|$)")
+
+# 診断用に保持するプロセス出力の行数（長時間録画でもメモリを一定に保つ）
+PROCESS_OUTPUT_TAIL_LINES = 200
+
+async def drain_stream(stream, buffer: deque):
+    """プロセス出力を逐次読み捨て、末尾のみbufferに保持"""
+    if stream is None:
+        return
+    while True:
+        try:
+            line = await stream.readline()
+        except ValueError:
+            # 改行を含まない長大な出力（\r区切りの進捗表示等）は読み捨てて継続
+            continue
+        if not line:
+            break
+        buffer.append(line)
+
+# 読み込み済み設定のLRUキャッシュ（キー: パス・更新時刻・サイズ、値は不変の設定インスタンス）
+CONFIG_CACHE_MAX_ENTRIES = 32
+_CFG_CACHE: "OrderedDict[Tuple[str, int, int], Any]" = OrderedDict()
+
+def clear_cache():
+    """設定読み込みキャッシュをクリア（強制再読み込み用）"""
+    _CFG_CACHE.clear()
+
+# 保存時に書き込む検証済みマーカー（値は内容のハッシュ。手編集で不一致になれば再検証する）
+VALIDATED_MARKER_KEY = "validated"
+
+def _content_digest(data: Dict[str, Any]) -> str:
+    """設定内容のダイジェスト（検証済みマーカーの値）"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+# SystemConfigのPath型フィールド
+_SYSTEM_PATH_FIELDS = ("project_root", "config_dir", "data_dir", "recordings_dir", "logs_dir")
+
+# dataclass毎のフィールド情報キャッシュ（フィールド名, Path型か）
+_FIELD_CACHE: Dict[type, Tuple[Tuple[str, bool], ...]] = {}
+
+def _dataclass_fields(cls) -> Tuple[Tuple[str, bool], ...]:
+    """フィールド情報取得（初回のみfields()を走査）"""
+    cached = _FIELD_CACHE.get(cls)
+    if cached is None:
+        cached = tuple((f.name, f.type is Path or f.type == 'Path') for f in fields(cls))
+        _FIELD_CACHE[cls] = cached
+    return cached
+
+# dataclass毎の有効フィールド名集合キャッシュ
+_VALID_FIELDS: Dict[type, frozenset] = {}
+
+def _valid_fields(cls) -> frozenset:
+    """有効フィールド名集合取得（初回のみfields()を走査）"""
+    valid = _VALID_FIELDS.get(cls)
+    if valid is None:
+        valid = frozenset(f.name for f in fields(cls))
+        _VALID_FIELDS[cls] = valid
+    return valid
 
 # ===============================
 # 🔧 完全対応設定クラス
 # ===============================
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SystemConfig:
     """システム全体の設定（実YAMLファイル完全対応版）"""
     # 基本ディレクトリ設定
@@ -51,30 +149,34 @@ class SystemConfig:
     log_retention_days: int = 30
     
     def __post_init__(self):
-        """初期化後処理（型変換・バリデーション）"""
+        """初期化後処理（型変換・バリデーション、frozenのため object.__setattr__ で補正）"""
         # Path型変換
-        if isinstance(self.project_root, str):
-            self.project_root = Path(self.project_root)
-        if isinstance(self.config_dir, str):
-            self.config_dir = Path(self.config_dir)
-        if isinstance(self.data_dir, str):
-            self.data_dir = Path(self.data_dir)
-        if isinstance(self.recordings_dir, str):
-            self.recordings_dir = Path(self.recordings_dir)
-        if isinstance(self.logs_dir, str):
-            self.logs_dir = Path(self.logs_dir)
+        for name in _SYSTEM_PATH_FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, str):
+                object.__setattr__(self, name, Path(value))
         
         # バリデーション
         if self.max_concurrent_recordings < 1:
-            self.max_concurrent_recordings = 1
+            object.__setattr__(self, 'max_concurrent_recordings', 1)
         if self.recording_timeout_minutes < 1:
-            self.recording_timeout_minutes = 60
+            object.__setattr__(self, 'recording_timeout_minutes', 60)
         if self.disk_space_threshold_gb < 0.1:
-            self.disk_space_threshold_gb = 1.0
+            object.__setattr__(self, 'disk_space_threshold_gb', 1.0)
         if self.memory_threshold_percent < 10 or self.memory_threshold_percent > 95:
-            self.memory_threshold_percent = 85.0
+            object.__setattr__(self, 'memory_threshold_percent', 85.0)
+    
+    @classmethod
+    def _trusted_from_dict(cls, data: Dict[str, Any]) -> "SystemConfig":
+        """検証済みデータからの高速生成（__post_init__のバリデーションを省略・全フィールド必須）"""
+        obj = object.__new__(cls)
+        for name, value in data.items():
+            object.__setattr__(obj, name, value)
+        for name in _SYSTEM_PATH_FIELDS:
+            object.__setattr__(obj, name, Path(data[name]))
+        return obj
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RecordingConfig:
     """録画設定（実YAMLファイル完全対応版）"""
     # 品質設定
@@ -97,42 +199,51 @@ class RecordingConfig:
     reconnect_timeout: int = 10
     segment_duration: int = 30
     
+    # Streamlink HLS取得設定（回線の揺らぎ対策）
+    hls_segment_threads: int = 3  # --stream-segment-threadsに渡す
+    ringbuffer_size: str = "64M"
+    hls_live_edge: int = 2
+    
     # 通知設定
     enable_notifications: bool = True
     notification_methods: List[str] = field(default_factory=lambda: ["console", "log"])
     
     def __post_init__(self):
-        """初期化後処理（バリデーション）"""
+        """初期化後処理（バリデーション、frozenのため object.__setattr__ で補正）"""
         # 品質設定の正規化
         valid_qualities = ["best", "worst", "hd", "medium", "low"]
         if self.video_quality not in valid_qualities:
-            self.video_quality = "best"
+            object.__setattr__(self, 'video_quality', "best")
         if self.audio_quality not in valid_qualities:
-            self.audio_quality = "best"
+            object.__setattr__(self, 'audio_quality', "best")
         
         # 数値バリデーション
         if self.max_reconnect_attempts < 0:
-            self.max_reconnect_attempts = 3
+            object.__setattr__(self, 'max_reconnect_attempts', 3)
         if self.reconnect_timeout < 1:
-            self.reconnect_timeout = 10
+            object.__setattr__(self, 'reconnect_timeout', 10)
         if self.segment_duration < 5:
-            self.segment_duration = 30
+            object.__setattr__(self, 'segment_duration', 30)
+        if not 1 <= self.hls_segment_threads <= 10:  # Streamlinkの許容範囲
+            object.__setattr__(self, 'hls_segment_threads', 3)
+        if self.hls_live_edge < 1:
+            object.__setattr__(self, 'hls_live_edge', 2)
+        if not self.ringbuffer_size:
+            object.__setattr__(self, 'ringbuffer_size', "64M")
         
         # フォーマット設定バリデーション
         valid_formats = ["mp4", "flv", "ts", "mkv", "avi"]
         if self.convert_format not in valid_formats:
-            self.convert_format = "mp4"
+            object.__setattr__(self, 'convert_format', "mp4")
         
         # format_preference の重複排除・有効性チェック
-        self.format_preference = [f for f in self.format_preference if f in valid_formats]
-        if not self.format_preference:
-            self.format_preference = ["mp4"]
+        format_preference = [f for f in self.format_preference if f in valid_formats]
+        object.__setattr__(self, 'format_preference', format_preference or ["mp4"])
         
         # notification_methods の有効性チェック
         valid_methods = ["console", "log", "email", "discord", "slack"]
-        self.notification_methods = [m for m in self.notification_methods if m in valid_methods]
-        if not self.notification_methods:
-            self.notification_methods = ["console", "log"]
+        notification_methods = [m for m in self.notification_methods if m in valid_methods]
+        object.__setattr__(self, 'notification_methods', notification_methods or ["console", "log"])
 
 # ===============================
 # 🗂️ 完全対応設定管理マネージャー
@@ -141,7 +252,26 @@ class RecordingConfig:
 class ConfigManager:
     """設定ファイル管理（完全対応修正版）"""
     
+    # 連続保存をまとめる待機時間（秒）
+    WRITE_DEBOUNCE_SECONDS = 0.1
+    
+    # config_dir毎のインスタンス（同一ディレクトリの再生成で設定を読み直さない）
+    _instances: Dict[Path, "ConfigManager"] = {}
+    _instances_lock = threading.Lock()
+    
+    def __new__(cls, config_dir: Optional[Path] = None):
+        key = Path(config_dir or Path.cwd() / "config").resolve()
+        with cls._instances_lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = super().__new__(cls)
+                cls._instances[key] = instance
+            return instance
+    
     def __init__(self, config_dir: Optional[Path] = None):
+        if getattr(self, "_initialized", False):
+            return
+        
         self.config_dir = config_dir or Path.cwd() / "config"
         self.config_dir.mkdir(parents=True, exist_ok=True)
         
@@ -152,49 +282,119 @@ class ConfigManager:
         self.system_config: Optional[SystemConfig] = None
         self.recording_config: Optional[RecordingConfig] = None
         self.urls: Dict[str, Any] = {}
+        # 未保存の変更があるか（save_all_configs()は変更のあった設定のみ書き込む）
+        self._dirty: Dict[str, bool] = {'system': False, 'recording': False, 'urls': False}
+        # 直近の検証結果（検証した設定スナップショット, 結果）
+        self._last_validation: Optional[Tuple[Tuple[Any, Any], Dict[str, Any]]] = None
+        # get_urls()用の読み取り専用ビュー（呼び出し毎の辞書コピーを回避）
+        self._urls_view: Optional[Mapping[str, Any]] = None
+        self._urls_view_source: Optional[Dict[str, Any]] = None
+        
+        # 設定ファイル書き込み用の単一ワーカー（イベントループを止めない・最新内容のみ書く）
+        self._io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cfg-io')
+        self._pending_writes: Dict[Path, Tuple[bytes, bool]] = {}
+        self._pending_lock = threading.Lock()
+        # ワーカーで発生した書き込みエラー（flush_writes()で呼び出し側へ送出）
+        self._write_errors: Dict[Path, Exception] = {}
         
         # 初期化時に自動読み込み
         self._initialize_configs()
+        self._initialized = True
     
     def _initialize_configs(self):
         """設定の初期化"""
         self.system_config = self._load_config(self.system_config_path, SystemConfig)
         self.recording_config = self._load_config(self.recording_config_path, RecordingConfig)
         self.urls = self._load_urls()
+        self._dirty = dict.fromkeys(self._dirty, False)
 
     def _load_config(self, path: Path, config_class):
         """設定ファイル読み込み（完全対応版）"""
-        if path.exists():
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = yaml.safe_load(f) or {}
-                
-                # 未知のキーワード引数を除外
-                valid_fields = {f.name for f in fields(config_class)}
-                filtered_data = {k: v for k, v in data.items() if k in valid_fields}
-                
-                # 除外されたキーがある場合はログ出力
-                excluded_keys = set(data.keys()) - valid_fields
-                if excluded_keys:
-                    logging.info(f"{path.name}: 未対応キー除外 - {excluded_keys}")
-                
-                return config_class(**filtered_data)
-                
-            except Exception as e:
-                logging.warning(f"{path.name} 読み込み失敗: {e}")
-                return config_class()
-        else:
+        try:
+            st = path.stat()
+            key = (str(path), st.st_mtime_ns, st.st_size)
+            cached = _CFG_CACHE.get(key)
+            if cached is not None:
+                _CFG_CACHE.move_to_end(key)
+                return cached
+            
+            config = self._parse_config(path, config_class)
+            _CFG_CACHE[key] = config
+            if len(_CFG_CACHE) > CONFIG_CACHE_MAX_ENTRIES:
+                _CFG_CACHE.popitem(last=False)
+            return config
+            
+        except FileNotFoundError:
+            return config_class()
+        except Exception as e:
+            logging.warning(f"{path.name} 読み込み失敗: {e}")
             return config_class()
 
+    def _parse_config(self, path: Path, config_class):
+        """設定ファイルを解析して設定インスタンスを生成"""
+        data = self._read_yaml_cached(path)
+        
+        marker = data.pop(VALIDATED_MARKER_KEY, None)
+        validated = isinstance(marker, str) and marker == _content_digest(data)
+        
+        # 未知のキーワード引数を除外
+        valid_fields = _valid_fields(config_class)
+        filtered_data = {k: v for k, v in data.items() if k in valid_fields}
+        
+        # 除外されたキーがある場合はログ出力
+        if len(filtered_data) != len(data) and logging.getLogger().isEnabledFor(logging.INFO):
+            excluded_keys = data.keys() - valid_fields
+            logging.info(f"{path.name}: 未対応キー除外 - {excluded_keys}")
+        
+        # 自身が保存したまま未編集のファイルで全フィールドが揃っていれば再検証を省略
+        trusted_factory = getattr(config_class, '_trusted_from_dict', None)
+        if validated and trusted_factory and len(filtered_data) == len(valid_fields):
+            return trusted_factory(filtered_data)
+        
+        return config_class(**filtered_data)
+
+    def _read_yaml_cached(self, path: Path) -> Dict[str, Any]:
+        """YAML読み込み（読み込み元と同じ更新時刻・サイズのpickleサイドカーがあればそちらを使用）"""
+        cache_path = path.with_suffix(path.suffix + '.pkl')
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = pickle.load(f)
+            # サイドカーの書き込みは遅延するため、mtimeの新旧ではなく生成元YAMLの識別情報で照合
+            st = path.stat()
+            if (isinstance(cached, dict) and isinstance(cached.get('data'), dict)
+                    and cached.get('source') == (st.st_mtime_ns, st.st_size)):
+                return cached['data']
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.debug(f"{cache_path.name} 読み込み失敗（YAMLから再生成）: {e}")
+        
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if st.st_size >= MMAP_THRESHOLD_BYTES:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    data = yaml.load(mm, Loader=YamlLoader) or {}
+            else:
+                data = yaml.load(f, Loader=YamlLoader) or {}
+        
+        if isinstance(data, dict):
+            cached = {'source': (st.st_mtime_ns, st.st_size), 'data': data}
+            self._schedule_write(cache_path, pickle.dumps(cached, protocol=pickle.HIGHEST_PROTOCOL), report_errors=False)
+        return data
+
     def _load_urls(self) -> Dict[str, Any]:
         """URL設定読み込み"""
-        if self.urls_config_path.exists():
-            try:
+        try:
+            if ORJSON_AVAILABLE:
+                data = orjson.loads(self.urls_config_path.read_bytes())
+            else:
                 with open(self.urls_config_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    return data if isinstance(data, dict) else {"twitcasting_urls": []}
-            except Exception as e:
-                logging.warning(f"URL設定読み込み失敗: {e}")
+            return data if isinstance(data, dict) else {"twitcasting_urls": []}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"URL設定読み込み失敗: {e}")
         return {"twitcasting_urls": []}
 
     # ✅ 修正1: 不足していたload_config()メソッド追加
@@ -202,6 +402,8 @@ class ConfigManager:
         """設定再読み込み（main.pyからの呼び出し対応）"""
         try:
             logging.info("設定ファイル再読み込み開始")
+            # 書き込み待ちの保存内容を反映してから読み直す（古いファイルの再読込を防止）
+            await self.flush_writes()
             self._initialize_configs()
             logging.info("✅ 設定ファイル再読み込み完了")
         except Exception as e:
@@ -210,83 +412,178 @@ class ConfigManager:
 
     def save_system_config(self):
         """システム設定保存"""
+        self._dirty['system'] = False
         self._save_config(self.system_config_path, self.system_config)
 
     def save_recording_config(self):
         """録画設定保存"""
+        self._dirty['recording'] = False
         self._save_config(self.recording_config_path, self.recording_config)
 
     def save_urls(self):
-        """URL設定保存"""
-        self._atomic_write_json(self.urls_config_path, self.urls)
+        """URL設定保存（書き込みはバックグラウンド）"""
+        self._dirty['urls'] = False
+        self._schedule_write(self.urls_config_path, self._serialize_json(self.urls))
 
     def save_all_configs(self):
-        """全設定保存"""
-        self.save_system_config()
-        self.save_recording_config()
-        self.save_urls()
+        """全設定保存（未保存の変更がある設定のみ・書き込み完了まで待機）"""
+        if self._dirty['system']:
+            self.save_system_config()
+        if self._dirty['recording']:
+            self.save_recording_config()
+        if self._dirty['urls']:
+            self.save_urls()
+        self.flush_writes_sync()
+
+    async def save_all_configs_async(self):
+        """全設定保存（シリアライズ・書き込み待機もイベントループ外で実行）"""
+        await asyncio.to_thread(self.save_all_configs)
+
+    def set_urls(self, urls: Dict[str, Any]):
+        """URL設定差し替え（保存はsave_urls()/save_all_configs()で行う）"""
+        self.urls = urls
+        self._dirty['urls'] = True
 
     def _save_config(self, path: Path, config_obj):
-        """設定オブジェクト保存"""
+        """設定オブジェクト保存（書き込みはバックグラウンド）"""
         try:
             data = self._dataclass_to_dict(config_obj)
-            self._atomic_write_yaml(path, data)
-            logging.debug(f"{path.name} 保存完了")
+            data[VALIDATED_MARKER_KEY] = _content_digest(data)
+            self._schedule_write(path, self._serialize_yaml(data))
         except Exception as e:
             logging.error(f"{path.name} 保存エラー: {e}")
 
+    def _schedule_write(self, filepath: Path, serialized: bytes, report_errors: bool = True):
+        """書き込み予約（同一ファイルへの未処理の予約は最新内容で上書き）
+
+        report_errors=Falseの書き込み（キャッシュ等）は失敗してもflush_writes()で送出しない
+        """
+        with self._pending_lock:
+            already_scheduled = filepath in self._pending_writes
+            self._pending_writes[filepath] = (serialized, report_errors)
+        if not already_scheduled:
+            self._io_executor.submit(self._flush_write, filepath)
+
+    def _flush_write(self, filepath: Path):
+        """予約済み書き込みの実行（ワーカースレッド）"""
+        time.sleep(self.WRITE_DEBOUNCE_SECONDS)
+        with self._pending_lock:
+            serialized, report_errors = self._pending_writes.pop(filepath)
+        try:
+            self._atomic_write_bytes(filepath, serialized)
+            logging.debug(f"{filepath.name} 保存完了")
+            error = None
+        except Exception as e:
+            logging.error(f"{filepath.name} 保存エラー: {e}")
+            error = e if report_errors else None
+        with self._pending_lock:
+            # 後続の書き込みが成功すれば以前のエラーは解消済み
+            if error is None:
+                self._write_errors.pop(filepath, None)
+            else:
+                self._write_errors[filepath] = error
+
+    def _raise_write_errors(self):
+        """ワーカーで発生した書き込みエラーを呼び出し側へ送出"""
+        with self._pending_lock:
+            errors = list(self._write_errors.values())
+            self._write_errors.clear()
+        if errors:
+            raise errors[0]
+
+    def flush_writes_sync(self):
+        """予約済み書き込みの完了を待機（同期版・失敗した書き込みがあれば例外を送出）"""
+        self._io_executor.submit(lambda: None).result()
+        self._raise_write_errors()
+
+    async def flush_writes(self):
+        """予約済み書き込みの完了を待機（失敗した書き込みがあれば例外を送出）"""
+        await asyncio.get_running_loop().run_in_executor(self._io_executor, lambda: None)
+        self._raise_write_errors()
+
     def _dataclass_to_dict(self, obj) -> Dict[str, Any]:
         """dataclassを辞書に変換"""
         if obj is None: 
             return {}
         
-        result = {}
-        # ✅ 修正2: field(obj) → fields(obj) に修正
-        for f in fields(obj):
-            value = getattr(obj, f.name)
-            # Path型は文字列に変換
-            if isinstance(value, Path):
-                result[f.name] = str(value)
-            else:
-                result[f.name] = value
-        
-        return result
+        return {
+            name: str(value) if is_path else value
+            for name, is_path in _dataclass_fields(type(obj))
+            for value in (getattr(obj, name),)
+        }
+
+    @staticmethod
+    def _serialize_yaml(data: Dict[str, Any]) -> bytes:
+        """YAMLシリアライズ（dataclassのフィールド定義順で出力、ソートしない）"""
+        return yaml.dump(
+            data, Dumper=YamlDumper, default_flow_style=False, allow_unicode=True, sort_keys=False, encoding='utf-8'
+        )
+
+    @staticmethod
+    def _serialize_json(data: Dict[str, Any]) -> bytes:
+        """JSONシリアライズ"""
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True).encode('utf-8')
 
     def _atomic_write_yaml(self, filepath: Path, data: Dict[str, Any]):
         """YAML原子的書き込み"""
-        temp_path = filepath.with_suffix('.tmp')
-        try:
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                yaml.dump(data, f, default_flow_style=False, allow_unicode=True, sort_keys=True)
-            temp_path.replace(filepath)
-        except Exception as e:
-            if temp_path.exists():
-                temp_path.unlink()
-            raise e
+        self._atomic_write_bytes(filepath, self._serialize_yaml(data))
 
     def _atomic_write_json(self, filepath: Path, data: Dict[str, Any]):
         """JSON原子的書き込み"""
-        temp_path = filepath.with_suffix('.tmp')
+        self._atomic_write_bytes(filepath, self._serialize_json(data))
+
+    @staticmethod
+    def _atomic_write_bytes(filepath: Path, serialized: bytes):
+        """シリアライズ済みデータの原子的書き込み（write → fsync → os.replace → ディレクトリfsync）"""
+        # 同一ディレクトリに一意な一時ファイルを排他作成（他プロセスの保存と衝突しない）
+        fd, temp_path = tempfile.mkstemp(prefix=filepath.name + '.', suffix='.tmp', dir=filepath.parent)
         try:
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False, sort_keys=True)
-            temp_path.replace(filepath)
-        except Exception as e:
-            if temp_path.exists():
-                temp_path.unlink()
-            raise e
+            with os.fdopen(fd, 'wb') as f:
+                f.write(serialized)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstempは0600で作成するため、既存ファイル（なければ既定）のパーミッションを引き継ぐ
+            try:
+                mode = os.stat(filepath).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = DEFAULT_FILE_MODE
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, filepath)
+        except Exception:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        ConfigManager._fsync_directory(filepath.parent)
+
+    @staticmethod
+    def _fsync_directory(directory: Path):
+        """リネーム結果を永続化するための親ディレクトリfsync（Windowsは非対応のため省略）"""
+        if IS_WINDOWS:
+            return
+        dir_fd = os.open(directory, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
 
     def get_system_config(self) -> SystemConfig:
-        """システム設定取得"""
+        """システム設定取得（不変スナップショット、更新時は新しいインスタンスに差し替わる）"""
         return self.system_config
 
     def get_recording_config(self) -> RecordingConfig:
-        """録画設定取得"""
+        """録画設定取得（不変スナップショット、更新時は新しいインスタンスに差し替わる）"""
         return self.recording_config
 
-    def get_urls(self) -> Dict[str, Any]:
-        """URL設定取得"""
-        return self.urls.copy()
+    def get_urls(self) -> Mapping[str, Any]:
+        """URL設定取得（読み取り専用ビュー、再読み込み時のみ再生成）"""
+        if self._urls_view_source is not self.urls:
+            self._urls_view = MappingProxyType(self.urls)
+            self._urls_view_source = self.urls
+        return self._urls_view
     
     def config_file_exists(self) -> bool:
         """設定ファイル存在チェック"""
@@ -308,13 +605,21 @@ class ConfigManager:
             if not self.urls_config_path.exists(): 
                 self.save_urls()
                 logging.info(f"デフォルトURL設定作成: {self.urls_config_path}")
+            
+            # 直後の再読み込みで作成済みファイルを読めるよう書き込み完了を待つ
+            await self.flush_writes()
                 
         except Exception as e:
             logging.error(f"デフォルト設定作成エラー: {e}")
             raise
 
     async def validate_config(self) -> Dict[str, Any]:
-        """設定検証"""
+        """設定検証（前回正常だった設定スナップショットから変化がなければ結果を再利用）"""
+        # 設定はfrozenで更新時に差し替わるため、同一インスタンスなら内容も同一
+        snapshot = (self.system_config, self.recording_config)
+        if self._last_validation and all(a is b for a, b in zip(self._last_validation[0], snapshot)):
+            return dict(self._last_validation[1])
+        
         issues = []
         
         try:
@@ -334,10 +639,13 @@ class ConfigManager:
                 if not self.recording_config.notification_methods:
                     issues.append("notification_methods が空です")
             
-            return {
+            result = {
                 'valid': len(issues) == 0,
                 'issues': issues
             }
+            # ディレクトリ作成等で解消し得るため、問題ありの結果はキャッシュしない
+            self._last_validation = (snapshot, result) if result['valid'] else None
+            return dict(result)
             
         except Exception as e:
             return {
@@ -363,16 +671,20 @@ class ConfigManager:
             
             # 録画設定修復
             if self.recording_config:
+                fixes = {}
                 if not self.recording_config.format_preference:
-                    self.recording_config.format_preference = ["mp4"]
-                    repaired = True
+                    fixes['format_preference'] = ["mp4"]
                 
                 if not self.recording_config.notification_methods:
-                    self.recording_config.notification_methods = ["console", "log"]
+                    fixes['notification_methods'] = ["console", "log"]
+                
+                if fixes:
+                    self.recording_config = replace(self.recording_config, **fixes)
+                    self._dirty['recording'] = True
                     repaired = True
             
             if repaired:
-                self.save_all_configs()
+                await self.save_all_configs_async()
                 logging.info("✅ 設定自動修復完了")
             
             return True
@@ -382,20 +694,26 @@ class ConfigManager:
             return False
 
     def update_system_config(self, **kwargs):
-        """システム設定更新"""
+        """システム設定更新（値に変化がなければ保存しない）"""
         if self.system_config:
-            for key, value in kwargs.items():
-                if hasattr(self.system_config, key):
-                    setattr(self.system_config, key, value)
-            self.save_system_config()
+            updated = self._replace_config(self.system_config, kwargs)
+            if updated != self.system_config:
+                self.system_config = updated
+                self.save_system_config()
 
     def update_recording_config(self, **kwargs):
-        """録画設定更新"""
+        """録画設定更新（値に変化がなければ保存しない）"""
         if self.recording_config:
-            for key, value in kwargs.items():
-                if hasattr(self.recording_config, key):
-                    setattr(self.recording_config, key, value)
-            self.save_recording_config()
+            updated = self._replace_config(self.recording_config, kwargs)
+            if updated != self.recording_config:
+                self.recording_config = updated
+                self.save_recording_config()
+
+    @staticmethod
+    def _replace_config(config_obj, changes: Dict[str, Any]):
+        """既知フィールドのみ反映した新しい設定インスタンスを生成"""
+        valid_fields = _valid_fields(type(config_obj))
+        return replace(config_obj, **{k: v for k, v in changes.items() if k in valid_fields})
 
 # ===============================
 # 🔍 依存関係チェッカー（変更なし）
@@ -404,44 +722,142 @@ class ConfigManager:
 class DependencyChecker:
     """システム依存関係確認"""
     
+    # シェルを介さず直接起動するためargv形式で保持
     REQUIRED_COMMANDS = {
-        'streamlink': 'streamlink --version', 
-        'yt-dlp': 'yt-dlp --version', 
-        'ffmpeg': 'ffmpeg -version'
+        'streamlink': ('streamlink', '--version'), 
+        'yt-dlp': ('yt-dlp', '--version'), 
+        'ffmpeg': ('ffmpeg', '-version')
     }
     OPTIONAL_COMMANDS = {
-        'playwright': 'playwright --version'
+        'playwright': ('playwright', '--version')
     }
     
+    # チェック結果の再利用期間（秒）
+    CACHE_TTL = 24 * 60 * 60
+    # 起動を跨いで結果を再利用するキャッシュファイル名（config_dir配下）
+    DISK_CACHE_FILENAME = "deps_cache.json"
+    # コマンド → (確認時刻, 実行ファイルキー, 結果)
+    _result_cache: Dict[Tuple[str, ...], Tuple[float, Optional[str], Dict[str, Any]]] = {}
+    
+    def __init__(self, config_dir: Optional[Path] = None):
+        self.cache_path = (config_dir or Path.cwd() / "config") / self.DISK_CACHE_FILENAME
+        self._disk_cache = self._load_disk_cache()
+        self._disk_cache_dirty = False
+    
+    def _load_disk_cache(self) -> Dict[str, Any]:
+        """ディスクキャッシュ読み込み"""
+        try:
+            if ORJSON_AVAILABLE:
+                data = orjson.loads(self.cache_path.read_bytes())
+            else:
+                data = json.loads(self.cache_path.read_text(encoding='utf-8'))
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.debug(f"{self.cache_path.name} 読み込み失敗: {e}")
+            return {}
+    
+    async def _save_disk_cache(self):
+        """ディスクキャッシュ保存（変更時のみ）"""
+        if not self._disk_cache_dirty:
+            return
+        self._disk_cache_dirty = False
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            await asyncio.to_thread(
+                ConfigManager._atomic_write_bytes, self.cache_path, ConfigManager._serialize_json(self._disk_cache)
+            )
+        except Exception as e:
+            logging.debug(f"{self.cache_path.name} 保存失敗: {e}")
+    
     async def check_all_dependencies(self) -> Dict[str, Dict[str, Any]]:
-        """全依存関係チェック"""
-        results = {'required': {}, 'optional': {}}
+        """全依存関係チェック（各コマンドを並行実行）"""
+        groups = (('required', self.REQUIRED_COMMANDS), ('optional', self.OPTIONAL_COMMANDS))
+        entries = [(group, name, command) for group, commands in groups for name, command in commands.items()]
         
-        for name, command in self.REQUIRED_COMMANDS.items():
-            results['required'][name] = await self._check_command(command)
+        checked = await asyncio.gather(
+            *(self._check_command_cached(command) for _, _, command in entries),
+            return_exceptions=True
+        )
         
-        for name, command in self.OPTIONAL_COMMANDS.items():
-            results['optional'][name] = await self._check_command(command)
+        results = {'required': {}, 'optional': {}}
+        for (group, name, _), result in zip(entries, checked):
+            if isinstance(result, Exception):
+                result = {'available': False, 'error': str(result)}
+            results[group][name] = result
         
+        await self._save_disk_cache()
         return results
     
-    async def _check_command(self, command: str) -> Dict[str, Any]:
-        """コマンド実行チェック"""
+    async def _check_command_cached(self, command: Tuple[str, ...]) -> Dict[str, Any]:
+        """コマンド実行チェック（実行ファイルが更新されていなければ結果を再利用）"""
+        executable = shutil.which(command[0])
+        try:
+            st = os.stat(executable) if executable else None
+            exe_key = f"{executable}:{st.st_mtime_ns}:{st.st_size}" if st else None
+        except OSError:
+            exe_key = None
+        
+        now = time.time()
+        cached = self._result_cache.get(command)
+        if cached and cached[1] == exe_key and now - cached[0] < self.CACHE_TTL:
+            return cached[2]
+        
+        # 前回起動時の結果（実行ファイルが同一の場合のみ）
+        cache_name = ' '.join(command)
+        entry = self._disk_cache.get(cache_name)
+        if (exe_key and isinstance(entry, dict) and entry.get('key') == exe_key
+                and now - entry.get('checked_at', 0) < self.CACHE_TTL):
+            self._result_cache[command] = (entry['checked_at'], exe_key, entry['result'])
+            return entry['result']
+        
+        result = await self._check_command(command)
+        self._result_cache[command] = (now, exe_key, result)
+        if exe_key:
+            self._disk_cache[cache_name] = {'key': exe_key, 'checked_at': now, 'result': result}
+            self._disk_cache_dirty = True
+        return result
+    
+    # バージョン確認で保持する出力の上限（stdoutは先頭行のみ使用）
+    VERSION_OUTPUT_LIMIT = 4096
+    
+    async def _check_command(self, command: Tuple[str, ...]) -> Dict[str, Any]:
+        """コマンド実行チェック（出力は並行して読み捨て、先頭のみ保持）"""
+        process = None
         try:
-            process = await asyncio.create_subprocess_shell(
-                command,
+            process = await asyncio.create_subprocess_exec(
+                *command,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
                 creationflags=CREATE_NO_WINDOW
             )
             
-            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=10.0)
+            async def read_head(stream) -> bytes:
+                # 先頭VERSION_OUTPUT_LIMITバイトのみ保持し、残りはパイプ詰まり防止のため読み捨て
+                head = b''
+                while chunk := await stream.read(self.VERSION_OUTPUT_LIMIT):
+                    if len(head) < self.VERSION_OUTPUT_LIMIT:
+                        head += chunk[:self.VERSION_OUTPUT_LIMIT - len(head)]
+                return head
+            
+            async def run() -> Tuple[bytes, bytes]:
+                output = await asyncio.gather(read_head(process.stdout), read_head(process.stderr))
+                await process.wait()
+                return output
+            
+            stdout_head, stderr_head = await asyncio.wait_for(run(), timeout=10.0)
             
             return {
                 'available': process.returncode == 0,
-                'version': stdout.decode('utf-8', errors='ignore').strip().split('\n')[0],
-                'error': stderr.decode('utf-8', errors='ignore').strip()
+                'version': stdout_head.split(b'\n', 1)[0].decode('utf-8', errors='ignore').rstrip(),
+                'error': stderr_head.decode('utf-8', errors='ignore').strip() if process.returncode != 0 else ''
             }
+        except asyncio.TimeoutError:
+            # 応答しないプロセスを残さない
+            process.kill()
+            await process.wait()
+            return {'available': False, 'error': f"タイムアウト: {' '.join(command)}"}
         except Exception as e:
             return {'available': False, 'error': str(e)}
 
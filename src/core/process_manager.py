@@ -5,16 +5,113 @@ process_manager.py - 高機能版復元
 録画テスト完了まで対応
 """
 
+import os
+import ctypes
 import asyncio
 import psutil
 import logging
 import time
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+def _enumerate_processes_windows() -> Iterator[Tuple[int, str]]:
+    """Toolhelpスナップショットによるプロセス列挙（Windows）"""
+    from ctypes import wintypes
+    
+    class PROCESSENTRY32W(ctypes.Structure):
+        _fields_ = [
+            ('dwSize', wintypes.DWORD),
+            ('cntUsage', wintypes.DWORD),
+            ('th32ProcessID', wintypes.DWORD),
+            ('th32DefaultHeapID', ctypes.c_size_t),
+            ('th32ModuleID', wintypes.DWORD),
+            ('cntThreads', wintypes.DWORD),
+            ('th32ParentProcessID', wintypes.DWORD),
+            ('pcPriClassBase', wintypes.LONG),
+            ('dwFlags', wintypes.DWORD),
+            ('szExeFile', wintypes.WCHAR * 260),
+        ]
+    
+    TH32CS_SNAPPROCESS = 0x00000002
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    kernel32.CreateToolhelp32Snapshot.argtypes = [wintypes.DWORD, wintypes.DWORD]
+    kernel32.Process32FirstW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+    kernel32.Process32NextW.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESSENTRY32W)]
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    
+    snapshot = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPPROCESS, 0)
+    if snapshot in (None, ctypes.c_void_p(-1).value):
+        raise ctypes.WinError(ctypes.get_last_error())
+    try:
+        entry = PROCESSENTRY32W()
+        entry.dwSize = ctypes.sizeof(PROCESSENTRY32W)
+        ok = kernel32.Process32FirstW(snapshot, ctypes.byref(entry))
+        while ok:
+            yield entry.th32ProcessID, entry.szExeFile
+            ok = kernel32.Process32NextW(snapshot, ctypes.byref(entry))
+    finally:
+        kernel32.CloseHandle(snapshot)
+
+# /proc/<pid>/comm の最大長（カーネルのTASK_COMM_LEN - 1、超える名前は切り詰められる）
+_PROC_COMM_MAX_LEN = 15
+
+def _read_proc_name(pid: str) -> str:
+    """/proc/<pid>/comm からプロセス名取得（切り詰められた場合はcmdlineのargv[0]で補完）"""
+    with open(f'/proc/{pid}/comm', encoding='utf-8', errors='replace') as f:
+        name = f.read().strip()
+    if len(name) < _PROC_COMM_MAX_LEN:
+        return name
+    # psutil.Process.name()と同様、argv[0]のファイル名が切り詰め後の名前で始まれば採用
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            argv0 = f.read().split(b'\0', 1)[0].decode('utf-8', errors='replace')
+    except OSError:
+        return name
+    full_name = os.path.basename(argv0)
+    return full_name if full_name.startswith(name) else name
+
+def _enumerate_processes_proc() -> Iterator[Tuple[int, str]]:
+    """/proc/<pid>/comm によるプロセス列挙（Linux）"""
+    with os.scandir('/proc') as entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                yield int(entry.name), _read_proc_name(entry.name)
+            except OSError:
+                continue
+
+def _enumerate_processes() -> Iterator[Tuple[int, str]]:
+    """(PID, プロセス名) の軽量列挙（psutil.Processの生成は一致したPIDのみで行う）"""
+    if os.name == 'nt':
+        return _enumerate_processes_windows()
+    if os.path.isdir('/proc'):
+        return _enumerate_processes_proc()
+    return ((proc.info['pid'], proc.info['name'] or '') for proc in psutil.process_iter(['pid', 'name']))
+
+def _wait_then_kill(proc: psutil.Process, proc_name: str) -> bool:
+    """terminate済みプロセスの終了待機（タイムアウト時は強制終了）"""
+    try:
+        try:
+            proc.wait(timeout=3)
+            logger.info(f"✅ 穏やかな終了成功: {proc_name}")
+        except psutil.TimeoutExpired:
+            # Step 2: 強制終了
+            logger.warning(f"強制終了実行: {proc_name}")
+            proc.kill()
+            proc.wait(timeout=2)
+            logger.info(f"✅ 強制終了完了: {proc_name}")
+        return True
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+    except Exception as e:
+        logger.error(f"プロセス終了エラー: {e}")
+        return False
+
 class ProcessManager:
     """高機能プロセス管理クラス"""
     
@@ -24,39 +121,39 @@ class ProcessManager:
     
     async def terminate_orphan_processes(self, patterns: List[str]) -> Dict[str, int]:
         """段階的プロセス終了（terminate → kill）"""
-        result = {}
+        result = {pattern: 0 for pattern in patterns}
+        lowered_patterns = [(pattern, pattern.lower()) for pattern in patterns]
+        victims = []
         
-        for pattern in patterns:
-            count = 0
-            for proc in psutil.process_iter(['pid', 'name']):
-                try:
-                    proc_name = proc.info['name'].lower()
-                    if pattern.lower() in proc_name:
-                        pid = proc.info['pid']
-                        
-                        # Step 1: 穏やかな終了
-                        logger.info(f"プロセス終了開始: {proc_name} (PID: {pid})")
-                        proc.terminate()
-                        
-                        try:
-                            proc.wait(timeout=3)
-                            logger.info(f"✅ 穏やかな終了成功: {proc_name}")
-                        except psutil.TimeoutExpired:
-                            # Step 2: 強制終了
-                            logger.warning(f"強制終了実行: {proc_name}")
-                            proc.kill()
-                            proc.wait(timeout=2)
-                            logger.info(f"✅ 強制終了完了: {proc_name}")
-                        
-                        count += 1
-                        
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-                except Exception as e:
-                    logger.error(f"プロセス終了エラー: {e}")
+        # プロセス一覧の走査は1回のみ（全パターンを各プロセスで判定）
+        for pid, name in _enumerate_processes():
+            try:
+                proc_name = name.lower()
+                matched = next((pattern for pattern, lowered in lowered_patterns if lowered in proc_name), None)
+                if matched is None:
                     continue
-            
-            result[pattern] = count
+                proc = psutil.Process(pid)
+                
+                # Step 1: 穏やかな終了（全プロセスへ先に送信）
+                logger.info(f"プロセス終了開始: {proc_name} (PID: {pid})")
+                proc.terminate()
+                victims.append((proc, proc_name, matched))
+                
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            except Exception as e:
+                logger.error(f"プロセス終了エラー: {e}")
+                continue
+        
+        # 終了待機は並列実行（待ち時間の合計ではなく最大値で済む）
+        outcomes = await asyncio.gather(
+            *(asyncio.to_thread(_wait_then_kill, proc, proc_name) for proc, proc_name, _ in victims)
+        )
+        for (_, _, matched), terminated in zip(victims, outcomes):
+            if terminated:
+                result[matched] += 1
+        
+        for pattern, count in result.items():
             logger.info(f"パターン '{pattern}': {count}個のプロセス終了")
         
         return result
@@ -72,28 +169,27 @@ class ProcessManager:
         # completed ディレクトリ作成
         completed_dir.mkdir(parents=True, exist_ok=True)
         
-        # .mp4 ファイルを移動
-        for mp4_file in temp_dir.glob("*.mp4"):
-            try:
-                dest_file = completed_dir / mp4_file.name
-                
-                # ファイル移動実行
-                mp4_file.replace(dest_file)
-                
-                # 移動確認
-                if dest_file.exists() and not mp4_file.exists():
-                    file_size = dest_file.stat().st_size
+        # .mp4 ファイルを移動（DirEntryのstat結果を利用、os.replaceは原子的なので事後確認は不要）
+        with os.scandir(temp_dir) as entries:
+            for entry in entries:
+                if not (entry.name.endswith('.mp4') and entry.is_file()):
+                    continue
+                try:
+                    dest_file = completed_dir / entry.name
+                    size_mb = entry.stat().st_size / (1024*1024)
+                    
+                    # ファイル移動実行
+                    os.replace(entry.path, dest_file)
+                    
                     moved_files.append({
-                        'src': str(mp4_file),
+                        'src': entry.path,
                         'dest': str(dest_file),
-                        'size_mb': round(file_size / (1024*1024), 2)
+                        'size_mb': round(size_mb, 2)
                     })
-                    logger.info(f"✅ ファイル移動成功: {dest_file.name} ({file_size/1024/1024:.1f}MB)")
-                else:
-                    logger.error(f"❌ ファイル移動失敗: {mp4_file.name}")
+                    logger.info(f"✅ ファイル移動成功: {dest_file.name} ({size_mb:.1f}MB)")
                     
-            except Exception as e:
-                logger.error(f"ファイル移動エラー: {mp4_file.name} - {e}")
+                except Exception as e:
+                    logger.error(f"ファイル移動エラー: {entry.name} - {e}")
         
         return moved_files
     
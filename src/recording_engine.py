@@ -7,16 +7,28 @@ Streamlinkを使用した本格的な録画システム
 import os
 import logging
 import asyncio
-import subprocess
-import threading
 import time
 import json
 import signal
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Deque, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
-import platform
+from functools import lru_cache
+
+from config_core import IS_WINDOWS, CREATE_NO_WINDOW, PROCESS_OUTPUT_TAIL_LINES, drain_stream
+
+# ファイルサイズ表示単位（1024倍ごと）
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# RecordingConfigの既定ファイル名テンプレート（一致時はstr.formatを省略）
+DEFAULT_FILENAME_TEMPLATE = "{user}_{date}_{time}_{title}"
+
+@lru_cache(maxsize=4096)
+def _extract_username(url: str) -> str:
+    """URLからユーザー名抽出（同一URLは繰り返し参照されるためキャッシュ）"""
+    return url.rstrip('/').rsplit('/', 1)[-1] or "unknown"
 
 class RecordingMethod(Enum):
     """録画方式"""
@@ -35,6 +47,11 @@ class RecordingStatus(Enum):
 class RecordingEngine:
     """実録画エンジン"""
     
+    # 完了・失敗録画の履歴保持件数（古いものから破棄、統計は全件の累計で保持）
+    RECORDING_HISTORY_SIZE = 1000
+    # シャットダウン時に後処理タスクの完了を待つ上限（秒）
+    SHUTDOWN_TASK_TIMEOUT = 30
+    
     def __init__(self, config_manager, auth_manager=None):
         self.config_manager = config_manager
         self.auth_manager = auth_manager
@@ -43,15 +60,21 @@ class RecordingEngine:
         # 設定取得
         self.system_config = config_manager.get_system_config()
         self.recording_config = config_manager.get_recording_config()
+        self._filename_template = self.recording_config.filename_template
         
-        # 録画管理
+        # 録画管理（イベントループスレッドからのみ、await を挟まずに更新するためロック不要）
         self.active_recordings: Dict[str, Dict[str, Any]] = {}
-        self.completed_recordings: List[Dict[str, Any]] = []
-        self.failed_recordings: List[Dict[str, Any]] = []
+        self.completed_recordings: Deque[Dict[str, Any]] = deque(maxlen=self.RECORDING_HISTORY_SIZE)
+        self.failed_recordings: Deque[Dict[str, Any]] = deque(maxlen=self.RECORDING_HISTORY_SIZE)
+        # 累計（履歴の破棄に影響されず、統計取得時に毎回集計しないよう逐次加算）
+        self._completed_count = 0
+        self._failed_count = 0
+        self._total_completed_size = 0
         
         # 制御
         self.shutdown_requested = False
-        self._lock = threading.Lock()
+        # 実行中のバックグラウンドタスク（GCによる消失防止・シャットダウン時に待機）
+        self._background_tasks: set = set()
         
         # 出力ディレクトリ作成
         self._ensure_directories()
@@ -80,15 +103,11 @@ class RecordingEngine:
                             method: RecordingMethod = RecordingMethod.STREAMLINK) -> bool:
         """録画開始"""
         try:
-            username = self._extract_username(url)
-            
-            # 重複チェック
-            if self.is_recording(url):
-                self.logger.warning(f"既に録画中: {username}")
-                return False
+            username = _extract_username(url)
             
-            # ファイル名生成
-            filename = self._generate_filename(username)
+            # ファイル名生成（ファイル名と開始時刻で同一の時刻を使用）
+            now = datetime.now()
+            filename = self._generate_filename(username, now)
             output_path = self.recordings_dir / filename
             temp_path = self.temp_dir / filename
             
@@ -99,7 +118,7 @@ class RecordingEngine:
                 'password': password,
                 'method': method.value,
                 'status': RecordingStatus.STARTING.value,
-                'start_time': datetime.now().isoformat(),
+                'start_time': now.isoformat(),
                 'output_path': str(output_path),
                 'temp_path': str(temp_path),
                 'process': None,
@@ -107,11 +126,13 @@ class RecordingEngine:
                 'duration': 0
             }
             
-            with self._lock:
-                self.active_recordings[url] = recording_info
+            # 重複チェックと登録を1回のdict操作で実施
+            if self.active_recordings.setdefault(url, recording_info) is not recording_info:
+                self.logger.warning(f"既に録画中: {username}")
+                return False
             
             # 非同期で録画開始
-            asyncio.create_task(self._run_recording(url, recording_info))
+            self._track_task(self._run_recording(url, recording_info))
             
             self.logger.info(f"✅ 録画開始: {username}")
             return True
@@ -120,6 +141,13 @@ class RecordingEngine:
             self.logger.error(f"❌ 録画開始エラー: {url} - {e}")
             return False
     
+    def _track_task(self, coro) -> asyncio.Task:
+        """タスクを生成し、完了まで参照を保持"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+    
     async def _run_recording(self, url: str, recording_info: Dict[str, Any]):
         """録画実行"""
         username = recording_info['username']
@@ -156,7 +184,10 @@ class RecordingEngine:
                 '--output', temp_path,
                 '--force',
                 '--quiet',
-                '--retry-streams', '3'
+                '--retry-streams', '3',
+                '--stream-segment-threads', str(self.recording_config.hls_segment_threads),
+                '--hls-live-edge', str(self.recording_config.hls_live_edge),
+                '--ringbuffer-size', self.recording_config.ringbuffer_size
             ]
             
             # 年齢制限・限定配信対応（Cookie使用）
@@ -173,25 +204,19 @@ class RecordingEngine:
             if password:
                 self.logger.warning(f"限定配信パスワード検出（未対応）: {username}")
             
-            # プロセス作成フラグ（Windows対応）
-            creation_flags = 0
-            if platform.system() == "Windows":
-                creation_flags = subprocess.CREATE_NO_WINDOW
-            
             self.logger.info(f"Streamlinkコマンド: {' '.join(cmd)}")
             
             # プロセス開始
             process = await asyncio.create_subprocess_exec(
                 *cmd,
-                stdout=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
                 stderr=asyncio.subprocess.PIPE,
-                creationflags=creation_flags
+                creationflags=CREATE_NO_WINDOW
             )
             
             # 録画情報更新
-            with self._lock:
-                recording_info['process'] = process
-                recording_info['status'] = RecordingStatus.RECORDING.value
+            recording_info['process'] = process
+            recording_info['status'] = RecordingStatus.RECORDING.value
             
             self.logger.info(f"Streamlink録画開始: {username}")
             
@@ -218,23 +243,17 @@ class RecordingEngine:
                 '--no-part'
             ]
             
-            # プロセス作成フラグ（Windows対応）
-            creation_flags = 0
-            if platform.system() == "Windows":
-                creation_flags = subprocess.CREATE_NO_WINDOW
-            
             # プロセス開始
             process = await asyncio.create_subprocess_exec(
                 *cmd,
-                stdout=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.DEVNULL,
                 stderr=asyncio.subprocess.PIPE,
-                creationflags=creation_flags
+                creationflags=CREATE_NO_WINDOW
             )
             
             # 録画情報更新
-            with self._lock:
-                recording_info['process'] = process
-                recording_info['status'] = RecordingStatus.RECORDING.value
+            recording_info['process'] = process
+            recording_info['status'] = RecordingStatus.RECORDING.value
             
             self.logger.info(f"yt-dlp録画開始: {username}")
             
@@ -249,13 +268,22 @@ class RecordingEngine:
         """録画プロセス監視"""
         username = recording_info['username']
         
+        # 出力は全量を溜めず逐次読み捨てる（パイプ詰まりによる停止・メモリ増加を防止）
+        stdout_tail = deque(maxlen=PROCESS_OUTPUT_TAIL_LINES)
+        stderr_tail = deque(maxlen=PROCESS_OUTPUT_TAIL_LINES)
+        drain_tasks = [
+            asyncio.create_task(drain_stream(process.stdout, stdout_tail)),
+            asyncio.create_task(drain_stream(process.stderr, stderr_tail))
+        ]
+        
         try:
             # プロセス完了を待機（タイムアウト対応）
             try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
+                await asyncio.wait_for(
+                    process.wait(),
                     timeout=self.system_config.recording_timeout_minutes * 60
                 )
+                await asyncio.gather(*drain_tasks)
                 
                 return_code = process.returncode
                 
@@ -264,12 +292,14 @@ class RecordingEngine:
                     return True
                 else:
                     self.logger.error(f"録画異常終了: {username} (終了コード: {return_code})")
-                    if stderr:
-                        self.logger.error(f"エラー出力: {stderr.decode('utf-8', errors='ignore')}")
+                    if stderr_tail:
+                        self.logger.error(f"エラー出力: {b''.join(stderr_tail).decode('utf-8', errors='ignore')}")
                     return False
                     
             except asyncio.TimeoutError:
                 self.logger.warning(f"録画タイムアウト: {username}")
+                for task in drain_tasks:
+                    task.cancel()
                 process.kill()
                 await process.wait()
                 return False
@@ -277,6 +307,10 @@ class RecordingEngine:
         except Exception as e:
             self.logger.error(f"プロセス監視エラー: {username} - {e}")
             return False
+        finally:
+            for task in drain_tasks:
+                if not task.done():
+                    task.cancel()
     
     async def _finalize_recording(self, url: str, recording_info: Dict[str, Any], success: bool):
         """録画完了処理"""
@@ -301,25 +335,24 @@ class RecordingEngine:
                 recording_info['status'] = RecordingStatus.COMPLETED.value
                 
                 # 完了リストに追加
-                with self._lock:
-                    if url in self.active_recordings:
-                        del self.active_recordings[url]
-                    self.completed_recordings.append(recording_info.copy())
+                self.active_recordings.pop(url, None)
+                self.completed_recordings.append(recording_info.copy())
+                self._completed_count += 1
+                self._total_completed_size += recording_info['file_size']
                 
                 self.logger.info(f"✅ 録画完了: {username} ({self._format_file_size(recording_info['file_size'])})")
                 
                 # 後処理（変換等）
                 if self.recording_config.auto_convert:
-                    asyncio.create_task(self._post_process_recording(recording_info))
+                    self._track_task(self._post_process_recording(recording_info))
             
             else:
                 recording_info['status'] = RecordingStatus.FAILED.value
                 
                 # 失敗リストに追加
-                with self._lock:
-                    if url in self.active_recordings:
-                        del self.active_recordings[url]
-                    self.failed_recordings.append(recording_info.copy())
+                self.active_recordings.pop(url, None)
+                self.failed_recordings.append(recording_info.copy())
+                self._failed_count += 1
                 
                 # 一時ファイル削除
                 if temp_path.exists():
@@ -351,11 +384,11 @@ class RecordingEngine:
     async def stop_recording(self, url: str) -> bool:
         """録画停止"""
         try:
-            if not self.is_recording(url):
+            recording_info = self.active_recordings.get(url)
+            if recording_info is None:
                 self.logger.warning(f"録画停止: 対象なし - {url}")
                 return False
             
-            recording_info = self.active_recordings[url]
             username = recording_info['username']
             process = recording_info.get('process')
             
@@ -363,7 +396,7 @@ class RecordingEngine:
                 # プロセス終了
                 recording_info['status'] = RecordingStatus.STOPPING.value
                 
-                if platform.system() == "Windows":
+                if IS_WINDOWS:
                     process.terminate()
                 else:
                     process.send_signal(signal.SIGTERM)
@@ -390,70 +423,80 @@ class RecordingEngine:
     
     def get_active_recordings(self) -> Dict[str, Any]:
         """アクティブな録画一覧取得"""
-        with self._lock:
-            return {url: info.copy() for url, info in self.active_recordings.items()}
+        return {url: info.copy() for url, info in self.active_recordings.items()}
     
     def get_statistics(self) -> Dict[str, Any]:
         """統計情報取得"""
-        total_recordings = len(self.completed_recordings) + len(self.failed_recordings)
+        total_recordings = self._completed_count + self._failed_count
         success_rate = 0.0
         
         if total_recordings > 0:
-            success_rate = (len(self.completed_recordings) / total_recordings) * 100
-        
-        total_size = sum(rec.get('file_size', 0) for rec in self.completed_recordings)
+            success_rate = (self._completed_count / total_recordings) * 100
         
         return {
             'total_recordings': total_recordings,
-            'completed_recordings': len(self.completed_recordings),
-            'failed_recordings': len(self.failed_recordings),
+            'completed_recordings': self._completed_count,
+            'failed_recordings': self._failed_count,
             'active_recordings': len(self.active_recordings),
             'success_rate': round(success_rate, 1),
-            'total_file_size_mb': round(total_size / (1024 * 1024), 1)
+            'total_file_size_mb': round(self._total_completed_size / (1024 * 1024), 1)
         }
     
-    def _extract_username(self, url: str) -> str:
-        """URLからユーザー名抽出"""
-        try:
-            return url.rstrip('/').split('/')[-1]
-        except:
-            return "unknown"
-    
-    def _generate_filename(self, username: str) -> str:
+    def _generate_filename(self, username: str, now: Optional[datetime] = None) -> str:
         """ファイル名生成"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        now = now or datetime.now()
+        date_str = now.strftime('%Y%m%d')
+        time_str = now.strftime('%H%M%S')
+        title = username  # 実際のタイトル取得は将来実装
+        
+        # テンプレート適用（既定テンプレートはformatを介さず直接組み立て）
+        if self._filename_template == DEFAULT_FILENAME_TEMPLATE:
+            return f"{username}_{date_str}_{time_str}_{title}.mp4"
         
-        # テンプレート適用
-        template = self.recording_config.filename_template
-        filename = template.format(
+        filename = self._filename_template.format(
             user=username,
-            date=datetime.now().strftime('%Y%m%d'),
-            time=datetime.now().strftime('%H%M%S'),
-            title=username  # 実際のタイトル取得は将来実装
+            date=date_str,
+            time=time_str,
+            title=title
         )
         
         return f"{filename}.mp4"
     
     def _format_file_size(self, size_bytes: int) -> str:
         """ファイルサイズフォーマット"""
-        if size_bytes == 0:
+        if size_bytes <= 0:
             return "0 B"
         
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size_bytes < 1024:
-                return f"{size_bytes:.1f} {unit}"
-            size_bytes /= 1024
-        
-        return f"{size_bytes:.1f} TB"
+        # ビット長から単位を直接求める（整数演算のみ、浮動小数のlog計算なし）
+        idx = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+        return f"{size_bytes / (1 << (10 * idx)):.1f} {_SIZE_UNITS[idx]}"
     
-    def shutdown(self):
-        """シャットダウン"""
+    async def shutdown(self):
+        """シャットダウン（全録画の停止と後処理の完了を待機）"""
         self.logger.info("録画エンジンシャットダウン開始")
         self.shutdown_requested = True
         
         # 全ての録画を停止
         urls_to_stop = list(self.active_recordings.keys())
-        for url in urls_to_stop:
-            asyncio.create_task(self.stop_recording(url))
+        await asyncio.gather(*(self.stop_recording(url) for url in urls_to_stop), return_exceptions=True)
+        
+        # 録画完了処理・後処理の完了を待機（プロセス未起動の監視等で終わらない場合は打ち切り）
+        if self._background_tasks:
+            pending = list(self._background_tasks)
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*pending, return_exceptions=True),
+                    timeout=self.SHUTDOWN_TASK_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                remaining = [task for task in pending if not task.done()]
+                self.logger.warning(f"⚠️ 後処理タスク待機タイムアウト、{len(remaining)}件をキャンセル")
+                for task in remaining:
+                    task.cancel()
+                await asyncio.gather(*remaining, return_exceptions=True)
         
-        self.logger.info("録画エンジンシャットダウン完了")
\ No newline at end of file
+        self.logger.info("録画エンジンシャットダウン完了")
+    
+    async def cleanup(self):
+        """クリーンアップ（オーケストレーター終了処理からの呼び出し対応）"""
+        await self.shutdown()
\ No newline at end of file
@@ -15,6 +15,17 @@ from datetime import datetime, timedelta
 from enum import Enum
 from bs4 import BeautifulSoup
 
+# 現在時刻のISO文字列キャッシュ（[生成時刻, 文字列]、1秒単位で更新）
+_ISO_CACHE = [0.0, '']
+
+def _now_iso() -> str:
+    """現在時刻のISO文字列（同一秒内の呼び出しは整形を省略）"""
+    now = time.time()
+    if now - _ISO_CACHE[0] >= 1.0:
+        _ISO_CACHE[0] = now
+        _ISO_CACHE[1] = datetime.fromtimestamp(now).isoformat(timespec='seconds')
+    return _ISO_CACHE[1]
+
 class StreamStatus(Enum):
     """配信状態"""
     OFFLINE = "offline"
@@ -158,7 +169,7 @@ class TwitCastingMonitor:
     async def _check_all_streams(self):
         """全配信チェック"""
         self.check_count += 1
-        self.last_check_time = datetime.now().isoformat()
+        self.last_check_time = _now_iso()
         
         # 並列チェック（ただし同時接続数を制限）
         semaphore = asyncio.Semaphore(3)  # 最大3同時接続
@@ -334,7 +345,7 @@ class TwitCastingMonitor:
             if url in self.stream_states:
                 self.stream_states[url].update({
                     'status': status.value,
-                    'last_check': datetime.now().isoformat(),
+                    'last_check': _now_iso(),
                     'check_count': self.stream_states[url]['check_count'] + 1,
                     'title': stream_data.get('title', ''),
                     'viewer_count': stream_data.get('viewer_count', 0),
@@ -349,7 +360,7 @@ class TwitCastingMonitor:
             if url in self.stream_states:
                 self.stream_states[url].update({
                     'status': StreamStatus.ERROR.value,
-                    'last_check': datetime.now().isoformat(),
+                    'last_check': _now_iso(),
                     'last_error': error
                 })
             
@@ -75,6 +75,11 @@ class URLAnalyzer:
         ('standard', r'https?://(?:www\.)?twitcasting\.tv/([a-zA-Z0-9_]+)/?(?:\?.*)?$')
     ]
     
+    # 判定順を保ったままクラス定義時に一度だけコンパイル
+    _COMPILED_URL_PATTERNS = tuple(
+        (pattern_type, re.compile(pattern, re.IGNORECASE)) for pattern_type, pattern in URL_PATTERNS
+    )
+    
     def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         self.session = session
         self.user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -149,8 +154,8 @@ class URLAnalyzer:
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url if url.startswith('twitcasting.tv') else 'https://twitcasting.tv/' + url
         
-        for pattern_type, pattern in self.URL_PATTERNS:
-            match = re.match(pattern, url, re.IGNORECASE)
+        for pattern_type, pattern in self._COMPILED_URL_PATTERNS:
+            match = pattern.match(url)
             if match:
                 return self._create_analysis_from_match(url, pattern_type, match)
         